@@ -1,11 +1,12 @@
 # main.py
 
 from machine import Pin
-import time
+import uasyncio as asyncio
 import json
-from websocket_client import WebSocketClient
-from leds import blink_thirty_percent_white  # On importe la même fonction d'animation que sur "buzzers"
-import _thread
+import log
+from async_websocket_client import AsyncWebSocketClient
+import leds  # Même module LED que sur "buzzers", configuré par led_config.py
+from animation import Animator
 
 # Définition des boutons sur des GPIOs
 button1 = Pin(33, Pin.IN, Pin.PULL_UP)
@@ -23,76 +24,94 @@ def read_buttons():
 
 # Configuration du WebSocket
 url = "ws://192.168.10.213:8080/dancePadConnect"
-ws = WebSocketClient(url)
+ws = AsyncWebSocketClient(url)
 
-print("Connexion au serveur WebSocket (dancePadConnect) ...")
-if ws.connect():
-    print("Connecté au serveur WebSocket (dancePadConnect)")
-else:
-    print("Échec de connexion au serveur WebSocket (dancePadConnect)")
+# Animations du bandeau, jouées par une tâche à part
+animator = Animator(leds.write)
 
-# Thread pour recevoir les messages du serveur WebSocket
-def websocket_receiver():
+# Traitement des messages reçus du serveur WebSocket
+def handle_message(message):
     """
-    Thread chargé de recevoir et traiter les messages du serveur.
+    Traite un message reçu du serveur.
     S'inspire de la logique du code 'buzzers' :
     - Décodage JSON
     - Détection du type "confirmSoluce"
     - Lancement de l'animation blink_thirty_percent_white
     """
-    while True:
-        try:
-            message = ws.receive()
-            if message:
-                print("Message reçu du WS:", message)
-                try:
-                    data = json.loads(message)
-                    # Si on détecte la même info que sur le "buzzers" (type = confirmSoluce)
-                    if data.get("type") == "confirmSoluce":
-                        print("Lancement de l'animation confirmSoluce (dancepad) !")
-                        blink_thirty_percent_white(blink_times=5, on_delay=0.2, off_delay=0.2)
-                except json.JSONDecodeError:
-                    print("Erreur de décodage JSON:", message)
-        except OSError as e:
-            # On ignore les erreurs de timeout ou de déconnexion momentanée
-            pass
-        except Exception as e:
-            print("Erreur dans la réception WebSocket (dancepad):", e)
+    log.info("Message reçu du WS: %s", message)
+    try:
+        data = json.loads(message)
+        # Si on détecte la même info que sur le "buzzers" (type = confirmSoluce)
+        if data.get("type") == "confirmSoluce":
+            log.info("Lancement de l'animation confirmSoluce (dancepad) !")
+            animator.play(leds.blink_thirty_percent_white_frames(blink_times=5, on_delay=0.2, off_delay=0.2),
+                          on_done=leds.release)
+    except ValueError:
+        log.warning("Erreur de décodage JSON: %s", message)
 
-# Lancement du thread pour la réception WebSocket
-_thread.start_new_thread(websocket_receiver, ())
+# Tâche de réception : remplace l'ancien thread de réception. Elle se charge
+# aussi des reconnexions (la boucle ne se termine qu'à ws.close())
+async def websocket_receiver():
+    async for message in ws:
+        handle_message(message)
 
-# À l'initialisation : envoyer "released" pour tous les boutons
-for i in range(4):
-    data = {'button': i + 1, 'state': 'released'}
-    ws.send(json.dumps(data))
-    print(f"État initial 'released' envoyé pour le bouton {i + 1}.")
+async def send_states(states):
+    """Envoie l'état de tous les boutons ; False si la connexion est coupée."""
+    for i, pressed in enumerate(states):
+        data = {'button': i + 1, 'state': 'pressed' if pressed else 'released'}
+        if not await ws.send(json.dumps(data)):
+            return False
+    return True
 
-# Écoute des boutons (boucle principale)
-previous_states = (False, False, False, False)
-try:
+# Tâche d'écoute des boutons
+async def buttons_watcher():
+    previous_states = (False, False, False, False)
+    session = 0  # ws.connections lors du dernier envoi de l'état complet
     while True:
         b1, b2, b3, b4 = read_buttons()
         current_states = (b1, b2, b3, b4)
+        # À chaque (re)connexion : état complet des boutons, les changements
+        # survenus pendant la coupure n'ayant pas été envoyés
+        if ws.connections != session and ws.connected:
+            if await send_states(current_states):
+                session = ws.connections
+                log.info("État des boutons envoyé au serveur.")
+            previous_states = current_states
         # On regarde si l'un des boutons a changé d'état
-        if current_states != previous_states:
+        elif current_states != previous_states:
             for i, (prev, curr) in enumerate(zip(previous_states, current_states)):
                 if not prev and curr:
                     # Bouton pressé
                     data = {'button': i + 1, 'state': 'pressed'}
-                    ws.send(json.dumps(data))
-                    print(f"Bouton {i + 1} pressé, envoyé au serveur.")
+                    await ws.send(json.dumps(data))
+                    log.info("Bouton %d pressé, envoyé au serveur.", i + 1)
                 elif prev and not curr:
                     # Bouton relâché
                     data = {'button': i + 1, 'state': 'released'}
-                    ws.send(json.dumps(data))
-                    print(f"Bouton {i + 1} relâché, envoyé au serveur.")
+                    await ws.send(json.dumps(data))
+                    log.info("Bouton %d relâché, envoyé au serveur.", i + 1)
             previous_states = current_states
 
-        time.sleep(0.1)  # Petit délai pour éviter de saturer la boucle
+        await asyncio.sleep(0.01)  # Rend la main aux autres tâches
+
+async def main():
+    print("Connexion au serveur WebSocket (dancePadConnect) ...")
+    if await ws.connect():
+        print("Connecté au serveur WebSocket (dancePadConnect)")
+    else:
+        # Pas d'abandon : la tâche de réception retente la connexion
+        print("Échec de connexion au serveur WebSocket (dancePadConnect), nouvel essai en tâche de fond")
+
+    # Boutons et réseau tournent en tâches coopératives sur un seul cœur ;
+    # buttons_watcher() envoie l'état initial des boutons dès la connexion
+    asyncio.create_task(websocket_receiver())
+    asyncio.create_task(animator.run())
+    await buttons_watcher()
+
+try:
+    asyncio.run(main())
 except KeyboardInterrupt:
     print("Arrêt de la surveillance des boutons (CTRL+C).")
 finally:
-    ws.close()
+    asyncio.run(ws.close())
     print("Connexion WebSocket fermée.")
-
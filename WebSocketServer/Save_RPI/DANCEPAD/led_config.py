@@ -0,0 +1,10 @@
+# led_config.py
+# Bandeau LED de la carte (dancepad), lu par leds.py à l'import.
+# À copier sur la carte avec leds.py, animation.py, led_render.py,
+# led_compose.py, led_lut.py et led_translate.py.
+
+LED_PIN = 2          # GPIO où le bandeau LED est connecté
+NUM_PIXELS = 300     # Nombre de LEDs dans le bandeau (ajustez selon votre bandeau)
+COLOR_ORDER = "GRB"  # Ordre des octets d'un pixel : "GRB" (WS2812), "RGB", "GRBW"...
+BRIGHTNESS = 255     # Luminosité globale (0..255), modifiable avec leds.set_brightness()
+GAMMA = 1.0          # Correction gamma à l'envoi (2.2 pour des fondus réguliers, 1.0 : aucune)
@@ -2,6 +2,7 @@ from machine import Pin, SPI
 from libs.mfrc522 import MFRC522
 import time
 import json
+import log
 from websocket_client import WebSocketClient
 
 # Configuration des broches pour le lecteur RFID
@@ -27,7 +28,7 @@ class RFIDReader:
                     card_id = int.from_bytes(bytes(uid), "little", False)
                     return card_id
         except Exception as e:
-            print("Erreur RFID:", e)
+            log.warning("Erreur RFID: %s", e)
         return None
 
 reader = RFIDReader(spi_id, sck, miso, mosi, cs, rst)
@@ -60,19 +61,22 @@ try:
                 current_card_id = card_id
                 data = {"card_id": card_id}
                 ws.send(json.dumps(data))
-                print(f"Badge détecté et envoyé : {card_id}")
+                log.info("Badge détecté et envoyé : %s", card_id)
         else:
             # Aucun badge détecté
             if current_card_id is not None:
                 # On avait un badge avant, donc il vient d'être retiré
-                print(f"Badge {current_card_id} retiré")
+                log.info("Badge %s retiré", current_card_id)
                 
                 # Optionnel : si vous souhaitez envoyer un message "badge_removed"
                 data = {"card_removed": current_card_id}
                 ws.send(json.dumps(data))
                 
                 current_card_id = None
-        
+
+        # Entretien du keepalive (ping/pong, mesure du RTT)
+        ws.receive_nowait()
+
         time.sleep(0.2)
 except KeyboardInterrupt:
     print("Arrêt du programme.")
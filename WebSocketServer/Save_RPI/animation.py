@@ -0,0 +1,162 @@
+# animation.py
+# Planificateur d'animations LED non bloquant, cadencé par échéances.
+#
+# Une animation est un générateur de trames : chaque itération dessine une
+# trame dans le tampon du bandeau puis cède la durée (en s) pendant laquelle
+# elle doit rester affichée. Le planificateur envoie la trame au bandeau et
+# reprend le générateur quand ce délai est écoulé, sans jamais attendre.
+#
+#   animator = Animator(leds.write)
+#   animator.play(leds.triple_white_comet_on_red_frames())
+#   while True:
+#       animator.tick()          # dans la boucle principale
+#       ...
+#
+# ou en tâche uasyncio : asyncio.create_task(animator.run())
+#
+# Horloge de trames : les échéances sont absolues (ticks_us), la trame n+1
+# est due à l'échéance de la trame n plus sa durée. Le temps de rendu, de
+# np.write() (~9 ms pour 300 LEDs) et le retard de la boucle ne s'ajoutent
+# donc pas aux délais, et une animation dure ce que la somme de ses délais
+# annonce. En retard, les trames dont la fenêtre d'affichage est déjà passée
+# sont calculées mais pas envoyées au bandeau (trames sautées).
+
+try:
+    from time import ticks_us, ticks_add, ticks_diff, sleep_us
+except ImportError:  # CPython
+    from mptime import ticks_us, ticks_add, ticks_diff, sleep_us
+
+# Pause de la tâche asynchrone quand aucune animation ne tourne
+IDLE_SLEEP_MS = 20
+
+
+class Animator:
+    def __init__(self, write):
+        # write() : envoie le tampon au bandeau (np.write)
+        self.write = write
+        self._frames = None
+        self._on_done = None
+        self._due = 0
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.frames = 0          # Trames envoyées au bandeau
+        self.skipped = 0         # Trames calculées mais sautées (retard)
+        self.worst_us = 0        # Pire temps rendu + envoi d'une trame
+        self._busy_us = 0
+        self._started = ticks_us()
+        self._elapsed_us = 0
+
+    @property
+    def running(self):
+        return self._frames is not None
+
+    def play(self, frames, on_done=None):
+        """
+        Lance une animation, en remplaçant celle en cours. on_done() est appelé
+        quand elle se termine ou par cancel(), mais pas si une autre animation
+        la remplace : la suivante réutilise le bandeau (on_done=leds.release
+        libérerait le rendu qu'elle a déjà pris).
+        """
+        self._stop()
+        self._frames = frames
+        self._on_done = on_done
+        self._reset_stats()
+        self._due = self._started
+
+    def cancel(self):
+        """Arrête l'animation en cours et appelle son on_done ; le bandeau garde sa dernière trame."""
+        on_done = self._on_done
+        if self._frames is not None:
+            self._stop()
+            if on_done is not None:
+                on_done()
+
+    def _stop(self):
+        if self._frames is not None:
+            self._frames.close()
+            self._finish()
+
+    def _finish(self):
+        self._frames = None
+        self._on_done = None
+        self._elapsed_us = ticks_diff(ticks_us(), self._started)
+
+    def tick(self):
+        """
+        Avance l'animation si l'échéance de sa prochaine trame est atteinte.
+        Retourne le nombre de µs avant la prochaine échéance (None si rien ne tourne).
+        """
+        if self._frames is None:
+            return None
+        now = ticks_us()
+        wait = ticks_diff(self._due, now)
+        if wait > 0:
+            return wait
+
+        # Première trame dont la fenêtre d'affichage n'est pas encore passée
+        rendered = False
+        while True:
+            try:
+                delay = next(self._frames)
+            except StopIteration:
+                on_done = self._on_done
+                if rendered:
+                    # La dernière trame reste affichée : elle doit être envoyée
+                    self.write()
+                    self.frames += 1
+                self._finish()
+                if on_done is not None:
+                    on_done()
+                return None
+            if rendered:
+                self.skipped += 1  # Trame précédente remplacée sans avoir été affichée
+            rendered = True
+            self._due = ticks_add(self._due, int(delay * 1000000))
+            if ticks_diff(self._due, now) > 0:
+                break
+
+        self.write()
+        self.frames += 1
+        busy = ticks_diff(ticks_us(), now)
+        self._busy_us += busy
+        if busy > self.worst_us:
+            self.worst_us = busy
+        return ticks_diff(self._due, ticks_us())
+
+    def stats(self):
+        """Trames envoyées et sautées, débit obtenu, temps moyen et pire temps par trame."""
+        elapsed = self._elapsed_us if self._frames is None else ticks_diff(ticks_us(), self._started)
+        return {
+            "frames": self.frames,
+            "skipped": self.skipped,
+            "fps": self.frames * 1000000 // elapsed if elapsed > 0 else 0,
+            "avg_us": self._busy_us // self.frames if self.frames else 0,
+            "worst_us": self.worst_us,
+        }
+
+    async def run(self):
+        """Tâche uasyncio : fait tourner les animations lancées par play()."""
+        # Importé ici : les programmes à boucle principale (tick()) ne
+        # chargent pas uasyncio au démarrage
+        try:
+            import uasyncio as asyncio
+        except ImportError:
+            import asyncio
+        while True:
+            wait = self.tick()
+            if wait is None:
+                wait = IDLE_SLEEP_MS * 1000
+            await asyncio.sleep(max(wait, 0) / 1000000)
+
+
+def play_blocking(frames, write):
+    """Joue une animation jusqu'au bout, cadencée par la même horloge de trames."""
+    animator = Animator(write)
+    animator.play(frames)
+    while True:
+        wait = animator.tick()
+        if wait is None:
+            return animator.stats()
+        if wait > 0:
+            sleep_us(wait)
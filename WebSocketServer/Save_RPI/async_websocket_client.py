@@ -0,0 +1,278 @@
+# async_websocket_client.py
+# Client WebSocket coopératif basé sur les streams uasyncio.
+# Fonctionne aussi sous CPython (asyncio) pour les tests sur PC.
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+import log
+from websocket_client import (WebSocketClient, backoff, build_frame, mask_inplace, ticks_ms,
+                              MAX_MESSAGE_SIZE, CONNECT_TIMEOUT_MS, MAX_HANDSHAKE_SIZE)
+
+
+class AsyncWebSocketClient:
+    """
+    Équivalent asynchrone de WebSocketClient :
+
+        ws = AsyncWebSocketClient("ws://192.168.10.213:8080/dancePadConnect")
+        await ws.connect()
+        await ws.send(json.dumps(data))
+        async for message in ws:
+            ...
+
+    Avec auto_reconnect (par défaut), c'est la tâche qui lit les messages qui
+    reconnecte : recv() attend la reconnexion (backoff exponentiel avec gigue,
+    comme le client bloquant) au lieu de retourner None, et la boucle
+    "async for" ne se termine qu'à close(). Pendant une coupure send()
+    retourne False sans mettre le message en file ; ws.connections change à
+    chaque (re)connexion, pour renvoyer l'état courant au serveur.
+    """
+
+
+    # Analyse d'URL et poignée de main partagées avec le client bloquant
+    _parse_url = WebSocketClient._parse_url
+    _generate_key = WebSocketClient._generate_key
+    _handshake_request = WebSocketClient._handshake_request
+    _check_handshake = WebSocketClient._check_handshake
+
+    def __init__(self, url, max_message_size=MAX_MESSAGE_SIZE,
+                 connect_timeout_ms=CONNECT_TIMEOUT_MS, auto_reconnect=True):
+        self.url = url
+        self.connected = False
+        self.connections = 0  # Connexions établies : change à chaque (re)connexion
+        self.auto_reconnect = auto_reconnect
+        self._closed_by_user = False
+        self._retry_delay_ms = 0
+        self._connect_lock = asyncio.Lock()
+        self.reader = None
+        self.writer = None
+        self.max_message_size = max_message_size
+        self.connect_timeout_ms = connect_timeout_ms
+        self.last_pong_ms = None
+        self._parse_url()
+
+    async def _handshake(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        key = self._generate_key()
+        self.writer.write(self._handshake_request(key))
+        await self.writer.drain()
+
+        # Ligne de statut puis en-têtes jusqu'à la ligne vide ; les trames
+        # arrivées dans le même segment restent dans le StreamReader
+        lines = []
+        size = 0
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise OSError("Connexion fermée pendant la poignée de main")
+            if line == b'\r\n':
+                break
+            size += len(line)
+            if size > MAX_HANDSHAKE_SIZE:
+                raise OSError("Réponse de poignée de main trop longue")
+            lines.append(str(line, 'utf-8').rstrip('\r\n'))
+        self._check_handshake('\r\n'.join(lines), key)
+
+    async def connect(self):
+        self._closed_by_user = False
+        # Une seule tentative à la fois (appel direct et tâche de réception)
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            return await self._connect()
+
+    async def _connect(self):
+        self._drop()
+        try:
+            await asyncio.wait_for(self._handshake(), self.connect_timeout_ms / 1000)
+            self.connected = True
+            self.connections += 1
+            self._retry_delay_ms = 0
+            return True
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                e = "Délai de poignée de main dépassé"
+            log.warning("Erreur de connexion: %s", e)
+            self._drop()
+            return False
+
+    def _drop(self):
+        """Abandonne la connexion courante sans trame de fermeture."""
+        self.connected = False
+        self.reader = None
+        if self.writer:
+            try:
+                self.writer.close()
+            except Exception:
+                pass
+            self.writer = None
+
+    async def _reconnect(self):
+        """Une tentative de reconnexion, après l'attente du backoff."""
+        wait, self._retry_delay_ms = backoff(self._retry_delay_ms)
+        if wait:
+            await asyncio.sleep(wait / 1000)
+        if self._closed_by_user or self.connected:
+            return
+        if await self.connect():
+            log.info("Reconnecté au serveur WebSocket %s", self.url)
+
+    async def _send_frame(self, opcode, payload=b''):
+        # Un tampon neuf par trame : le writer peut le conserver jusqu'au drain
+        buf, total = build_frame(None, opcode, payload)
+        self.writer.write(buf)
+        await self.writer.drain()
+
+    async def send(self, data):
+        """
+        Envoie data en trame texte (str) ou binaire (bytes, bytearray, memoryview).
+        Retourne False si le message n'est pas parti (connexion coupée).
+        """
+        if not self.connected:
+            if not self.auto_reconnect:
+                raise Exception("Non connecté au serveur")
+            return False
+
+        try:
+            if isinstance(data, str):
+                await self._send_frame(0x1, data.encode())  # FIN + Opcode TEXT
+            else:
+                await self._send_frame(0x2, data)  # FIN + Opcode BINARY
+            return True
+        except Exception as e:
+            log.warning("Erreur d'envoi: %s", e)
+            # La lecture en cours voit la fin du flux et relance la connexion
+            self._drop()
+            return False
+
+    async def _read_frame(self):
+        header = await self.reader.readexactly(2)
+        payload_length = header[1] & 0x7F
+        if payload_length == 126:
+            payload_length = int.from_bytes(await self.reader.readexactly(2), 'big')
+        elif payload_length == 127:
+            payload_length = int.from_bytes(await self.reader.readexactly(8), 'big')
+        if payload_length > self.max_message_size:
+            raise ValueError("Message trop grand")
+
+        mask_bits = None
+        if header[1] & 0x80:
+            mask_bits = await self.reader.readexactly(4)
+
+        payload = await self.reader.readexactly(payload_length) if payload_length else b''
+        if mask_bits:
+            payload = bytearray(payload)
+            mask_inplace(payload, 0, payload_length, mask_bits)
+        return header[0], payload
+
+    def _decode_message(self, opcode, payload):
+        if opcode == 0x1:  # Text
+            try:
+                return str(payload, 'utf-8')
+            except UnicodeError:
+                log.warning("Erreur décodage UTF-8")
+                return None
+        return bytes(payload)
+
+    async def recv(self):
+        """
+        Attend le prochain message : str (texte) ou bytes (binaire), les messages
+        fragmentés étant réassemblés. Retourne None quand la connexion se termine
+        et qu'elle ne doit pas être rétablie (auto_reconnect=False ou close()).
+        """
+        while True:
+            if self.connected:
+                message = await self._recv_message()
+                if message is not None:
+                    return message
+            if not self.auto_reconnect or self._closed_by_user:
+                return None
+            await self._reconnect()
+
+    async def _recv_message(self):
+        # Prochain message de la connexion courante, None quand elle se termine
+        fragments = None
+        fragments_opcode = None
+        reader = self.reader
+        while self.connected:
+            try:
+                first, payload = await self._read_frame()
+            except (EOFError, OSError) as e:
+                if self.reader is not reader:
+                    return None  # Connexion remplacée pendant la lecture
+                if self.connected:
+                    log.warning("Connexion WebSocket interrompue: %s", e)
+                self._drop()
+                return None
+            except ValueError:
+                # Trame annoncée plus grande que max_message_size : non lue
+                log.error("Message trop grand (max %d octets)", self.max_message_size)
+                await self._close(1009)
+                return None
+            fin = first & 0x80
+            opcode = first & 0x0F
+
+            if opcode == 0x1 or opcode == 0x2:  # Text / Binary
+                if fin:
+                    message = self._decode_message(opcode, payload)
+                    if message is not None:
+                        return message
+                else:
+                    fragments = bytearray(payload)
+                    fragments_opcode = opcode
+            elif opcode == 0x0:  # Continuation
+                if fragments is None:
+                    log.warning("Trame de continuation inattendue")
+                    continue
+                if len(fragments) + len(payload) > self.max_message_size:
+                    log.error("Message trop grand (max %d octets)", self.max_message_size)
+                    await self._close(1009)
+                    return None
+                fragments.extend(payload)
+                if fin:
+                    message = self._decode_message(fragments_opcode, fragments)
+                    fragments = None
+                    if message is not None:
+                        return message
+            elif opcode == 0x9:  # Ping
+                await self._send_frame(0xA, payload)
+            elif opcode == 0xA:  # Pong
+                self.last_pong_ms = ticks_ms()
+            elif opcode == 0x8:  # Close
+                log.info("Trame de fermeture reçue")
+                await self._close()
+            else:
+                log.warning("Opcode non géré: %d", opcode)
+        return None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.recv()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def close(self, code=None):
+        """Ferme volontairement la connexion (sans reconnexion automatique)."""
+        self._closed_by_user = True
+        await self._close(code)
+
+    async def _close(self, code=None):
+        if self.connected:
+            self.connected = False
+            try:
+                await self._send_frame(0x8, code.to_bytes(2, 'big') if code else b'')
+            except Exception:
+                pass
+        if self.writer:
+            try:
+                self.writer.close()
+                await self.writer.wait_closed()
+            except Exception:
+                pass
+            self.writer = None
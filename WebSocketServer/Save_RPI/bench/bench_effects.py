@@ -0,0 +1,140 @@
+# bench_effects.py
+# Banc de tous les effets de leds.py, trame par trame : temps de rendu (le
+# générateur dessine la trame), temps d'envoi (leds.write(), table de
+# luminosité comprise, plus le temps sur le fil), octets alloués par trame et
+# débit obtenu.
+#
+# PC : cd bench && python3 bench_effects.py [--save base.json] [--check base.json]
+#      (bandeau simulé par host/neopixel.py, envoi compté à 800 kHz)
+# ESP32 : copier benchutil.py, ce fichier et les modules LED (voir led_config.py)
+#
+# --save enregistre les mesures de référence, --check les compare et termine
+# en erreur si le rendu d'un effet ralentit de plus de TOLERANCE ou si ses
+# allocations par trame augmentent : à relancer sur la même machine après une
+# modification des boucles des effets. --brightness N mesure avec la table
+# gamma + luminosité active.
+
+import json
+import sys
+from benchutil import allocations, ticks_us, ticks_diff
+import leds
+
+FRAMES = 100
+TOLERANCE = 0.25       # Ralentissement toléré du rendu (25 %)...
+RENDER_SLACK_US = 20   # ...plus quelques µs (effets de 1 à 5 µs par trame sur PC)
+ALLOC_SLACK = 64       # Octets par trame tolérés en plus (bruit de mesure)
+
+EFFECTS = (
+    ("moving_point", lambda: leds.moving_point_frames((255, 0, 0))),
+    ("filling_effect", lambda: leds.filling_effect_frames((0, 0, 255))),
+    ("white_comet_over_red", lambda: leds.white_comet_over_red_frames([(127, 0, 0), (0, 0, 0)])),
+    ("rainbow_cycle", lambda: leds.rainbow_cycle_frames()),
+    ("single_path", lambda: leds.single_path_frames((0, 255, 0))),
+    ("single_filling", lambda: leds.single_filling_frames((0, 255, 0))),
+    ("fill_red_with_white_comets", lambda: leds.fill_red_with_white_comets_frames()),
+    ("triple_white_comet_on_red", lambda: leds.triple_white_comet_on_red_frames()),
+    ("breathing_red_effect", lambda: leds.breathing_red_effect_frames(duration=3600)),
+    ("blink_thirty_percent_white", lambda: leds.blink_thirty_percent_white_frames(blink_times=FRAMES)),
+)
+
+
+def prepared(factory):
+    # Première trame hors mesure : tables, fond et composition préparés
+    frames = factory()
+    next(frames)
+    return frames
+
+
+def drive(frames, count):
+    for _ in range(count):
+        next(frames)
+        leds.write()
+
+
+def run(factory):
+    """Retourne (trames, µs de rendu, µs d'envoi, octets alloués) pour FRAMES trames."""
+    np = leds.strip()
+    frames = prepared(factory)
+    wire_before = getattr(np, 'wire_us', 0)
+    render = write = count = 0
+    for _ in range(FRAMES):
+        t0 = ticks_us()
+        try:
+            next(frames)
+        except StopIteration:
+            break
+        t1 = ticks_us()
+        leds.write()
+        t2 = ticks_us()
+        render += ticks_diff(t1, t0)
+        write += ticks_diff(t2, t1)
+        count += 1
+    frames.close()
+    # Sur PC l'envoi ne coûte que le temps simulé sur le fil
+    write += getattr(np, 'wire_us', 0) - wire_before
+    allocated = allocations(drive, prepared(factory), count) if count else 0
+    return count, render, write, allocated
+
+
+def parse_args(argv):
+    opts = {}
+    i = 0
+    while i < len(argv):
+        if argv[i] in ("--save", "--check", "--brightness") and i + 1 < len(argv):
+            opts[argv[i][2:]] = argv[i + 1]
+            i += 2
+        else:
+            print("Option inconnue :", argv[i])
+            sys.exit(2)
+    return opts
+
+
+def main(argv):
+    opts = parse_args(argv)
+    if "brightness" in opts:
+        leds.set_brightness(int(opts["brightness"]), gamma=2.2)
+    print("Bandeau de {} LEDs, {} trames par effet".format(leds.NUM_PIXELS, FRAMES))
+    print("{:<28} {:>9} {:>9} {:>10} {:>9}".format(
+        "effet", "rendu µs", "envoi µs", "octets/tr", "trames/s"))
+
+    results = {}
+    for name, factory in EFFECTS:
+        count, render, write, allocated = run(factory)
+        if not count:
+            print("{:<28} (aucune trame)".format(name))
+            continue
+        frame_us = (render + write) / count
+        results[name] = {"render_us": render / count, "write_us": write / count,
+                         "alloc": allocated / count}
+        print("{:<28} {:>9.0f} {:>9.0f} {:>10.0f} {:>9.1f}".format(
+            name, render / count, write / count, allocated / count,
+            1000000 / frame_us if frame_us else 0))
+        leds.release()
+
+    if "save" in opts:
+        with open(opts["save"], "w") as f:
+            json.dump(results, f)
+        print("Référence enregistrée dans", opts["save"])
+
+    if "check" in opts:
+        with open(opts["check"]) as f:
+            base = json.load(f)
+        failed = 0
+        for name, ref in base.items():
+            cur = results.get(name)
+            if cur is None:
+                continue
+            if cur["render_us"] > ref["render_us"] * (1 + TOLERANCE) + RENDER_SLACK_US:
+                print("RÉGRESSION {} : rendu {:.0f} µs/trame (référence {:.0f})".format(
+                    name, cur["render_us"], ref["render_us"]))
+                failed += 1
+            if cur["alloc"] > ref["alloc"] + ALLOC_SLACK:
+                print("RÉGRESSION {} : {:.0f} octets alloués/trame (référence {:.0f})".format(
+                    name, cur["alloc"], ref["alloc"]))
+                failed += 1
+        if failed:
+            sys.exit(1)
+        print("Aucune régression par rapport à", opts["check"])
+
+
+main(sys.argv[1:])
@@ -0,0 +1,103 @@
+# bench_led_lut.py
+# Trames/s de l'arc-en-ciel et de la respiration rouge : version historique
+# (wheel() qui crée un tuple par LED, math.sin en flottants) contre les tables
+# précalculées de led_lut (accès indexés par des entiers uniquement), puis
+# coût par trame de la table gamma + luminosité appliquée à l'envoi et coût
+# du recalcul de cette table par set_brightness().
+#
+# PC : cd bench && python3 bench_led_lut.py (bandeau simulé, voir host/)
+# ESP32 : copier benchutil.py, ce fichier, leds.py, led_config.py, led_render.py,
+# led_lut.py et led_translate.py
+
+import math
+import random
+from benchutil import measure
+import leds
+import led_lut
+from leds import NUM_PIXELS
+
+np = leds.strip()
+
+FRAMES = 20
+
+
+def legacy_wheel(pos):
+    if pos < 85:
+        return (pos * 3, 255 - pos * 3, 0)
+    elif pos < 170:
+        pos -= 85
+        return (255 - pos * 3, 0, pos * 3)
+    else:
+        pos -= 170
+        return (0, pos * 3, 255 - pos * 3)
+
+
+def legacy_rainbow():
+    for j in range(FRAMES):
+        for i in range(NUM_PIXELS):
+            pixel_index = (i * 256 // NUM_PIXELS) + j
+            np[i] = legacy_wheel(pixel_index & 255)
+
+
+def legacy_breathing():
+    red_leds = list(range(0, NUM_PIXELS, 2))
+    phases = [random.uniform(0, 2 * math.pi) for _ in red_leds]
+    speeds = [random.uniform(0.02, 0.05) for _ in red_leds]
+    maxima = [random.randint(100, 255) for _ in red_leds]
+    for _ in range(FRAMES):
+        np.fill((0, 0, 0))
+        for idx, led in enumerate(red_leds):
+            brightness = int(maxima[idx] * (math.sin(phases[idx]) * 0.5 + 0.5))
+            np[led] = (brightness, 0, 0)
+            phases[idx] += speeds[idx]
+            if phases[idx] >= 2 * math.pi:
+                phases[idx] -= 2 * math.pi
+
+
+def run_frames(frames):
+    for _ in range(FRAMES):
+        next(frames)
+
+
+def run_translate(lut, out):
+    for _ in range(FRAMES):
+        led_lut.translate(np.buf, out, lut, len(out))
+
+
+def run_brightness(curve, out):
+    for level in range(FRAMES):
+        led_lut.brightness_table(level * 12, curve, out)
+
+
+def row(label, elapsed_us, allocated):
+    fps = FRAMES * 1000000 / elapsed_us if elapsed_us else 0
+    print("{:<30} {:>8.1f} trames/s {:>9} octets alloués".format(label, fps, allocated))
+    return fps
+
+
+def main():
+    print("Bandeau de {} LEDs, {} trames par mesure (sans np.write)".format(NUM_PIXELS, FRAMES))
+
+    old = row("arc-en-ciel (historique)", *measure(legacy_rainbow))
+    frames = leds.rainbow_cycle_frames()
+    next(frames)  # Tables de départ construites hors mesure
+    new = row("arc-en-ciel (tables)", *measure(run_frames, frames))
+    print("  gain : x{:.1f}".format(new / old if old else 0))
+
+    old = row("respiration (historique)", *measure(legacy_breathing))
+    frames = leds.breathing_red_effect_frames(duration=3600)
+    next(frames)
+    new = row("respiration (tables)", *measure(run_frames, frames))
+    print("  gain : x{:.1f}".format(new / old if old else 0))
+
+    # Une passe par trame dans la table de 256 octets, avant np.write()
+    lut = led_lut.brightness_table(128, led_lut.gamma_curve())
+    row("gamma + luminosité (translate)", *measure(run_translate, lut, bytearray(len(np.buf))))
+
+    # set_brightness() : recalcul de la table (µs par appel)
+    elapsed, allocated = measure(run_brightness, led_lut.gamma_curve(), bytearray(256))
+    print("{:<30} {:>8.1f} µs/appel  {:>9} octets alloués".format(
+        "set_brightness (table)", elapsed / FRAMES, allocated))
+
+
+main()
@@ -0,0 +1,117 @@
+# bench_leds.py
+# Temps de rendu d'une trame par effet : version historique (liste de 300
+# tuples reconstruite à chaque trame puis np[idx] = ... sur tout le bandeau)
+# contre le rendu direct dans np.buf de led_render, coût d'une trame composée
+# (led_compose) selon le nombre de comètes, et coût de np.write().
+#
+# PC : cd bench && python3 bench_leds.py (bandeau simulé, voir host/)
+# ESP32 : copier benchutil.py, ce fichier, leds.py, led_config.py, led_render.py et led_compose.py
+
+from benchutil import measure, ticks_us, ticks_diff
+import leds
+import led_compose
+from leds import NUM_PIXELS
+
+np = leds.strip()
+
+FRAMES = 50
+
+
+def legacy_triple_comet_frame(i, base_color=(127, 0, 0), comet_length=10, gap_length=15):
+    display_colors = [(base_color if idx % 2 == 0 else (0, 0, 0)) for idx in range(NUM_PIXELS)]
+    for j in range(3):
+        start_pos = i - (j * (comet_length + gap_length))
+        for k in range(comet_length):
+            pos = start_pos + k
+            if 0 <= pos < NUM_PIXELS:
+                brightness = int((255 - (k * (255 // comet_length))) * 0.4)
+                display_colors[pos] = (brightness, brightness, brightness)
+    for idx in range(NUM_PIXELS):
+        np[idx] = display_colors[idx]
+
+
+def legacy_white_comet_frame(i, base_colors, trail_length=10):
+    display_colors = base_colors.copy()
+    for j in range(trail_length):
+        pos = i - j
+        if 0 <= pos < NUM_PIXELS:
+            brightness = 255 - (j * (255 // trail_length))
+            display_colors[pos] = (brightness, brightness, brightness)
+    for idx in range(NUM_PIXELS):
+        np[idx] = display_colors[idx]
+
+
+def legacy_set_color(color):
+    for i in range(NUM_PIXELS):
+        np[i] = color
+
+
+def run_legacy(frame, *args):
+    for i in range(FRAMES):
+        frame(100 + i, *args)
+
+
+def run_frames(frames):
+    for _ in range(FRAMES):
+        next(frames)
+
+
+def run_repeat(fn, *args):
+    for _ in range(FRAMES):
+        fn(*args)
+
+
+def row(label, elapsed_us, allocated):
+    per_frame = elapsed_us / FRAMES
+    fps = 1000000 / per_frame if per_frame else 0
+    print("{:<34} {:>8.0f} µs/trame {:>7.0f} trames/s {:>9} octets alloués".format(
+        label, per_frame, fps, allocated))
+    return per_frame
+
+
+def compare(label, old, new):
+    print("  {} : x{:.1f}".format(label, old / new if new else 0))
+
+
+def skip_to_middle(frames):
+    # Place les comètes au milieu du bandeau (cas courant, rien de coupé)
+    for _ in range(100):
+        next(frames)
+    return frames
+
+
+def main():
+    print("Bandeau de {} LEDs, {} trames par mesure".format(NUM_PIXELS, FRAMES))
+
+    old = row("comète triple (historique)", *measure(run_legacy, legacy_triple_comet_frame))
+    new = row("comète triple (np.buf)",
+              *measure(run_frames, skip_to_middle(leds.triple_white_comet_on_red_frames())))
+    compare("comète triple", old, new)
+
+    base_colors = [(127, 0, 0) if i % 2 == 0 else (0, 0, 0) for i in range(NUM_PIXELS)]
+    old = row("comète sur fond (historique)", *measure(run_legacy, legacy_white_comet_frame, base_colors))
+    new = row("comète sur fond (np.buf)",
+              *measure(run_frames, skip_to_middle(leds.white_comet_over_red_frames(base_colors))))
+    compare("comète sur fond", old, new)
+
+    old = row("couleur unie (np[i] = ...)", *measure(run_repeat, legacy_set_color, (30, 30, 30)))
+    row("couleur unie (np.fill)", *measure(run_repeat, np.fill, (30, 30, 30)))
+    new = row("couleur unie (renderer.fill)", *measure(run_repeat, leds.renderer().fill, (30, 30, 30)))
+    compare("couleur unie", old, new)
+
+    # Trame composée : une copie de tranche par calque, quel que soit le
+    # nombre de comètes du train
+    for count in (1, 3, 8):
+        effect = {"background": [(127, 0, 0), (0, 0, 0)],
+                  "layers": [{"count": count, "length": 10, "gap": 15, "scale": 0.4}]}
+        row("composition, {} comète(s)".format(count),
+            *measure(run_frames, skip_to_middle(led_compose.frames(leds.renderer(), effect))))
+
+    # Envoi sur le bandeau, identique pour tous les effets
+    t0 = ticks_us()
+    for _ in range(FRAMES):
+        np.write()
+    row("np.write()", ticks_diff(ticks_us(), t0), 0)
+
+
+main()
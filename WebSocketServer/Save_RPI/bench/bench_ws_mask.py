@@ -0,0 +1,50 @@
+# bench_ws_mask.py
+# Compare le masquage historique (boucle Python par octet + nouveau bytearray)
+# au masquage sur place de websocket_client, pour des payloads de 16 o à 64 Ko.
+#
+# PC : cd bench && python3 bench_ws_mask.py
+# ESP32 : copier benchutil.py, ce fichier, websocket_client.py et ws_mask.py
+
+from benchutil import measure, report
+import websocket_client
+from websocket_client import mask_inplace
+
+MASK = b'\x37\xfa\x21\x3d'
+SIZES = (16, 128, 1024, 8192, 65536)
+
+
+def legacy_apply_mask(data, mask):
+    masked = bytearray(len(data))
+    for i in range(len(data)):
+        masked[i] = data[i] ^ mask[i % 4]
+    return masked
+
+
+def run_legacy(buf, repeat):
+    for _ in range(repeat):
+        legacy_apply_mask(buf, MASK)
+
+
+def run_inplace(buf, repeat):
+    for _ in range(repeat):
+        mask_inplace(buf, 0, len(buf), MASK)
+
+
+def main():
+    if mask_inplace is websocket_client._mask_inplace_portable:
+        print("Implémentation : portable (blocs de {} octets)".format(websocket_client.MASK_CHUNK))
+    else:
+        print("Implémentation : viper (mots de 32 bits)")
+
+    for size in SIZES:
+        buf = bytearray(size)
+        repeat = max(1, 16384 // size)
+        print("Payload de {} octets, {} passes".format(size, repeat))
+        old = report("  boucle par octet", repeat * size // 1024, "Ko",
+                     *measure(run_legacy, buf, repeat))
+        new = report("  sur place", repeat * size // 1024, "Ko",
+                     *measure(run_inplace, buf, repeat))
+        print("  gain : x{:.1f}".format(new / old if old else 0))
+
+
+main()
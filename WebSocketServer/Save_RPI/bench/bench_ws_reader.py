@@ -0,0 +1,127 @@
+# bench_ws_reader.py
+# Compare le lecteur de trames historique (recv(1) par octet) au lecteur
+# tamponné de WebSocketClient : trames/s et allocations sur le tas.
+#
+# PC : cd bench && python3 bench_ws_reader.py
+# ESP32 : copier benchutil.py, ce fichier et websocket_client.py puis l'importer
+
+from benchutil import measure, report
+import websocket_client
+from websocket_client import WebSocketClient
+
+NUM_FRAMES = 500
+SEGMENT = 1460  # Taille typique d'un segment TCP
+
+
+class FakeSocket:
+    """Socket simulé qui rejoue un flux d'octets par segments TCP."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.pos = 0
+
+    def rewind(self):
+        self.pos = 0
+
+    def recv(self, n):
+        n = min(n, SEGMENT, len(self.stream) - self.pos)
+        data = self.stream[self.pos:self.pos + n]
+        self.pos += n
+        return data
+
+    def recv_into(self, buf, nbytes=0):
+        n = min(nbytes or len(buf), SEGMENT, len(self.stream) - self.pos)
+        buf[:n] = self.stream[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+    readinto = recv_into
+
+
+class ReadyPoller:
+    """Poller simulé : le flux rejoué est toujours prêt à être lu."""
+
+    def register(self, obj, eventmask=None):
+        pass
+
+    modify = register
+
+    def unregister(self, obj):
+        pass
+
+    def poll(self, timeout=-1):
+        return [(None, FakeSelect.POLLIN)]
+
+
+class FakeSelect:
+    """Remplace le module select de websocket_client : FakeSocket n'a pas de
+    descripteur à enregistrer dans un vrai select.poll()."""
+    POLLIN = 0x001
+    POLLOUT = 0x004
+    POLLERR = 0x008
+    POLLHUP = 0x010
+    poll = ReadyPoller
+
+
+def build_stream(payload, count):
+    frame = bytearray([0x81])
+    if len(payload) < 126:
+        frame.append(len(payload))
+    else:
+        frame.append(126)
+        frame.extend(len(payload).to_bytes(2, 'big'))
+    frame.extend(payload)
+    return bytes(frame) * count
+
+
+def legacy_read_exactly(sock, num_bytes):
+    data = bytearray()
+    while len(data) < num_bytes:
+        chunk = sock.recv(1)
+        if not chunk:
+            return None
+        data.extend(chunk)
+    return data
+
+
+def legacy_receive(sock):
+    first = legacy_read_exactly(sock, 1)
+    second = legacy_read_exactly(sock, 1)
+    length = second[0] & 0x7F
+    if length == 126:
+        length = int.from_bytes(legacy_read_exactly(sock, 2), 'big')
+    return legacy_read_exactly(sock, length).decode('utf-8')
+
+
+def run_legacy(sock, count):
+    sock.rewind()
+    for _ in range(count):
+        legacy_receive(sock)
+
+
+def run_buffered(ws, count):
+    ws.socket.rewind()
+    ws._reset_reader()
+    for _ in range(count):
+        ws.receive()
+
+
+def main():
+    websocket_client.select = FakeSelect
+    for size in (32, 256, 1024):
+        payload = b'{"x": 1850, "y": 1900, "button": 1}'
+        payload = (payload * (size // len(payload) + 1))[:size]
+        sock = FakeSocket(build_stream(payload, NUM_FRAMES))
+        ws = WebSocketClient("ws://127.0.0.1:8080/bench", ping_interval=0)
+        ws.socket = sock
+        ws.connected = True
+
+        print("Payload de {} octets, {} trames".format(size, NUM_FRAMES))
+        old = report("  recv(1) par octet", NUM_FRAMES, "trames",
+                     *measure(run_legacy, sock, NUM_FRAMES))
+        new = report("  tampon + memoryview", NUM_FRAMES, "trames",
+                     *measure(run_buffered, ws, NUM_FRAMES))
+        print("  gain : x{:.1f}".format(new / old if old else 0))
+
+
+main()
@@ -0,0 +1,82 @@
+# bench_ws_send.py
+# Débit d'envoi de WebSocketClient : ancien chemin (en-tête + payload masqué
+# concaténés), nouveau chemin (tampon réutilisé, écriture complète) et mode
+# regroupé (un seul write() par tour de boucle de TICK messages).
+#
+# PC : cd bench && python3 bench_ws_send.py
+# ESP32 : copier benchutil.py, ce fichier, websocket_client.py et ws_mask.py
+
+from benchutil import measure, report
+from websocket_client import WebSocketClient, random
+
+NUM_MESSAGES = 1000
+TICK = 4  # Messages envoyés dans un même tour de boucle (bouton + dessin...)
+MESSAGE = '{"type": "updateStage", "stage": "Synapse", "action": "start"}'
+
+
+class CountingSocket:
+    """Socket simulé qui accepte tout et compte les appels à send()."""
+
+    def __init__(self):
+        self.writes = 0
+        self.sent = 0
+
+    def send(self, data):
+        self.writes += 1
+        self.sent += len(data)
+        return len(data)
+
+
+def legacy_send(sock, data):
+    data_bytes = data.encode()
+    mask_bytes = bytes([random.getrandbits(8) for _ in range(4)])
+    header = bytearray()
+    header.append(0b10000001)
+    length = len(data_bytes)
+    if length < 126:
+        header.append(0x80 | length)
+    else:
+        header.append(0x80 | 126)
+        header.extend(length.to_bytes(2, 'big'))
+    header.extend(mask_bytes)
+    masked = bytearray(len(data_bytes))
+    for i in range(len(data_bytes)):
+        masked[i] = data_bytes[i] ^ mask_bytes[i % 4]
+    sock.send(header + masked)
+
+
+def run_legacy(sock, count):
+    for _ in range(count):
+        legacy_send(sock, MESSAGE)
+
+
+def run_client(ws, count):
+    for i in range(count):
+        ws.send(MESSAGE)
+        if i % TICK == TICK - 1:
+            ws.flush()
+    ws.flush()
+
+
+def make_client(coalesce):
+    ws = WebSocketClient("ws://127.0.0.1:8080/bench", coalesce=coalesce)
+    ws.socket = CountingSocket()
+    ws.connected = True
+    return ws
+
+
+def main():
+    print("{} messages de {} octets".format(NUM_MESSAGES, len(MESSAGE)))
+
+    sock = CountingSocket()
+    report("  concaténation (ancien)", NUM_MESSAGES, "msg",
+           *measure(run_legacy, sock, NUM_MESSAGES))
+    print("    write() par message : {:.2f}".format(sock.writes / (2 * NUM_MESSAGES)))
+
+    for coalesce, label in ((False, "  tampon réutilisé"), (True, "  regroupé")):
+        ws = make_client(coalesce)
+        report(label, NUM_MESSAGES, "msg", *measure(run_client, ws, NUM_MESSAGES))
+        print("    write() par message : {:.2f}".format(ws.socket.writes / (2 * NUM_MESSAGES)))
+
+
+main()
@@ -0,0 +1,74 @@
+# benchutil.py
+# Outils communs aux micro-benchmarks : chronométrage et mesure des allocations.
+# Fonctionne sur l'ESP32 (MicroPython) comme sur un PC (CPython).
+
+import gc
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# Permet d'importer les modules du dossier parent (websocket_client, leds...) sur PC
+if '..' not in sys.path:
+    sys.path.append('..')
+
+# Sur PC : simulateur de machine.Pin et neopixel (dossier host/) et ticks de
+# MicroPython (../mptime.py), pour faire tourner les effets LED sans carte
+if sys.implementation.name != 'micropython' and 'host' not in sys.path:
+    sys.path.append('host')
+    import mptime
+    mptime.install()
+
+from time import ticks_us, ticks_diff
+
+
+def measure(fn, *args):
+    """
+    Exécute fn(*args) une fois et retourne (durée en µs, octets alloués).
+    Sur MicroPython le GC est désactivé pendant la mesure pour compter toutes
+    les allocations ; sur CPython on relève le pic de tracemalloc.
+    """
+    gc.collect()
+    if hasattr(gc, 'mem_alloc'):
+        gc.disable()
+        before = gc.mem_alloc()
+        t0 = ticks_us()
+        fn(*args)
+        elapsed = ticks_diff(ticks_us(), t0)
+        allocated = gc.mem_alloc() - before
+        gc.enable()
+        return elapsed, allocated
+
+    t0 = ticks_us()
+    fn(*args)
+    elapsed = ticks_diff(ticks_us(), t0)
+    # Seconde passe sous tracemalloc pour ne pas fausser le chronométrage
+    return elapsed, allocations(fn, *args)
+
+
+def allocations(fn, *args):
+    """
+    Octets alloués par fn(*args) : total avec le GC désactivé sur MicroPython,
+    pic de tracemalloc sur CPython.
+    """
+    gc.collect()
+    if hasattr(gc, 'mem_alloc'):
+        gc.disable()
+        before = gc.mem_alloc()
+        fn(*args)
+        allocated = gc.mem_alloc() - before
+        gc.enable()
+        return allocated
+    tracemalloc.start()
+    fn(*args)
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return allocated
+
+
+def report(label, count, unit, elapsed_us, allocated):
+    rate = count * 1000000 / elapsed_us if elapsed_us else 0
+    print("{:<28} {:>10.0f} {}/s  {:>9} octets alloués".format(label, rate, unit, allocated))
+    return rate
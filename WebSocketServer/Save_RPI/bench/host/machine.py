@@ -0,0 +1,62 @@
+# machine.py
+# Simulateur PC (CPython) du module machine de MicroPython, pour les bancs de
+# test et led_compile.py : seul ce dont les modules LED et d'entrées ont
+# besoin (Pin, avec un niveau et une interruption que le test pilote).
+#
+#   from machine import Pin
+#   button = Pin(22, Pin.IN, Pin.PULL_UP)
+#   button.irq(handler, Pin.IRQ_FALLING)
+#   button.drive(0)     # le test appuie : niveau bas, handler appelé
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 2
+    IRQ_RISING = 1
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        # Entrée au repos : niveau haut avec pull-up, bas sinon
+        self._value = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            self._value = 1 if value else 0
+        self._handler = None
+        self._trigger = 0
+
+    def __repr__(self):
+        return "Pin({})".format(self.id)
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = 1 if v else 0
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        self._handler = handler
+        self._trigger = trigger
+
+    def drive(self, v):
+        """Change le niveau vu sur la broche (côté test) et déclenche l'interruption."""
+        v = 1 if v else 0
+        old = self._value
+        self._value = v
+        if self._handler is None or v == old:
+            return
+        edge = Pin.IRQ_RISING if v else Pin.IRQ_FALLING
+        if self._trigger & edge:
+            self._handler(self)
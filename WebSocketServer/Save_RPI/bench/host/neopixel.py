@@ -0,0 +1,80 @@
+# neopixel.py
+# Simulateur PC (CPython) du module neopixel de MicroPython : même tampon,
+# mêmes accès (ORDER, bpp, fill) que le pilote de la carte, et write() qui
+# compte le temps que prendrait l'envoi sur le fil au lieu de l'émettre.
+#
+#   np = NeoPixel(Pin(2), 300)
+#   neopixel.record(100)        # garde les 100 dernières trames envoyées
+#   ... np.write() ...
+#   np.writes, np.wire_us, np.frames
+#
+# Temps d'envoi : 24 bits par pixel RGB à 800 kHz (1,25 µs par bit) plus le
+# reset de fin de trame, soit ~9 ms pour 300 LEDs. Avec REALTIME = True,
+# write() attend réellement cette durée (pour l'horloge de trames).
+
+import time
+from collections import deque
+
+BIT_US = 1.25        # 800 kHz
+RESET_US = 280       # Verrouillage des WS2812B
+REALTIME = False
+
+_record = 0
+
+
+def record(count):
+    """Nombre de trames envoyées gardées dans np.frames (0 : aucune)."""
+    global _record
+    _record = count
+
+
+def wire_us(nbytes):
+    """Durée d'envoi de nbytes octets sur le fil, en µs."""
+    return int(nbytes * 8 * BIT_US) + RESET_US
+
+
+class NeoPixel:
+    # G R B W
+    ORDER = (1, 0, 2, 3)
+
+    def __init__(self, pin, n, bpp=3, timing=1):
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+        self.timing = timing
+        self.writes = 0
+        self.wire_us = 0
+        self.frames = deque((), _record) if _record else None
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, i, v):
+        offset = i * self.bpp
+        for i in range(self.bpp):
+            self.buf[offset + self.ORDER[i]] = v[i]
+
+    def __getitem__(self, i):
+        offset = i * self.bpp
+        return tuple(self.buf[offset + self.ORDER[i]] for i in range(self.bpp))
+
+    def fill(self, v):
+        b = self.buf
+        l = len(self.buf)
+        bpp = self.bpp
+        for i in range(bpp):
+            c = v[i]
+            j = self.ORDER[i]
+            while j < l:
+                b[j] = c
+                j += bpp
+
+    def write(self):
+        us = wire_us(len(self.buf))
+        self.writes += 1
+        self.wire_us += us
+        if self.frames is not None:
+            self.frames.append(bytes(self.buf))
+        if REALTIME:
+            time.sleep(us / 1000000)
@@ -0,0 +1,168 @@
+# connection_manager.py
+# Une seule connexion WebSocket par URL pour tout le programme.
+#
+#   ws = connection_manager.get_client(url)
+#   ws.connect()                       # sans effet si déjà connecté
+#   ws.add_handler(on_message)         # appelé pour chaque message reçu
+#   ws.start_dispatcher()              # un seul thread lecteur par connexion
+#   ws.send(json.dumps(data))          # utilisable depuis n'importe quel thread
+#
+# Tant que le thread lecteur tourne, lui seul ferme et rouvre la connexion :
+# un envoi qui échoue dans un autre thread lui signale le socket fautif, qui
+# n'est fermé que s'il est toujours le socket courant (un ancien socket ne
+# peut pas faire tomber la connexion rouverte entre-temps).
+
+import _thread
+import time
+import log
+from websocket_client import WebSocketClient
+
+# Délai de lecture du thread lecteur, et pause entre deux essais de
+# reconnexion (le rythme réel est fixé par le backoff du client)
+DISPATCH_TIMEOUT_MS = 1000
+DISCONNECTED_SLEEP = 0.02
+
+
+class SharedWebSocketClient(WebSocketClient):
+    """
+    WebSocketClient partagé entre plusieurs threads : les envois (y compris
+    les pong et la trame de fermeture) et la file des messages à rejouer sont
+    protégés par des verrous, et un unique thread lecteur distribue les
+    messages reçus aux handlers.
+    """
+
+    def __init__(self, url, **kwargs):
+        super().__init__(url, **kwargs)
+        self._send_lock = _thread.allocate_lock()
+        self._connect_lock = _thread.allocate_lock()
+        self._outbox_lock = _thread.allocate_lock()
+        self._handlers = []
+        self._dispatching = False
+        self._dispatcher_id = None
+        self._failed_socket = None  # Socket en échec signalé par un autre thread
+
+    def _owns_connection(self):
+        """Vrai si le thread courant peut fermer et rouvrir la connexion."""
+        return not self._dispatching or _thread.get_ident() == self._dispatcher_id
+
+    def connect(self):
+        if not self._owns_connection():
+            return self.connected  # Le thread lecteur se charge des reconnexions
+        with self._connect_lock:
+            if self.connected:
+                return True
+            return WebSocketClient.connect(self)
+
+    def ensure_connected(self, wait_ms=0):
+        if not self._owns_connection():
+            return self.connected
+        return WebSocketClient.ensure_connected(self, wait_ms)
+
+    def _start_connect(self):
+        # Le tampon d'émission est remis à zéro : pas pendant un envoi
+        with self._send_lock:
+            WebSocketClient._start_connect(self)
+
+    def _disconnect(self):
+        if self._owns_connection():
+            WebSocketClient._disconnect(self)
+        elif self._closed_by_user:
+            self._failed_socket = self.socket
+        # Sinon le socket fautif a été noté par _send_frame()/_write_pending()
+        # et le thread lecteur le fermera
+
+    def _send_frame(self, opcode, payload=b''):
+        with self._send_lock:
+            sock = self.socket
+            try:
+                WebSocketClient._send_frame(self, opcode, payload)
+            except Exception:
+                self._failed_socket = sock
+                raise
+
+    def _write_pending(self):
+        # Appelé sous _send_lock par _send_frame() et flush()
+        sock = self.socket
+        try:
+            WebSocketClient._write_pending(self)
+        except Exception:
+            self._failed_socket = sock
+            raise
+
+    def flush(self):
+        with self._send_lock:
+            return WebSocketClient.flush(self)
+
+    def _drop_failed_socket(self):
+        """Thread lecteur : ferme le socket signalé en échec s'il est toujours le socket courant."""
+        sock = self._failed_socket
+        if sock is None:
+            return
+        self._failed_socket = None
+        if sock is self.socket:
+            WebSocketClient._disconnect(self)
+
+    def _enqueue(self, data):
+        with self._outbox_lock:
+            WebSocketClient._enqueue(self, data)
+
+    def _flush_outbox(self):
+        with self._outbox_lock:
+            return WebSocketClient._flush_outbox(self)
+
+    def add_handler(self, handler):
+        """Enregistre handler(message), appelé depuis le thread lecteur."""
+        if handler not in self._handlers:
+            self._handlers.append(handler)
+
+    def remove_handler(self, handler):
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+
+    def start_dispatcher(self):
+        """Démarre le thread lecteur (une seule fois par connexion)."""
+        if self._dispatching:
+            return
+        self._dispatching = True
+        _thread.start_new_thread(self._dispatch_loop, ())
+
+    def stop_dispatcher(self):
+        self._dispatching = False
+
+    def _dispatch_loop(self):
+        self._dispatcher_id = _thread.get_ident()
+        while self._dispatching:
+            self._drop_failed_socket()
+            # receive() se charge aussi des reconnexions
+            message = self.receive(timeout_ms=DISPATCH_TIMEOUT_MS)
+            if message is None:
+                if not self.connected:
+                    time.sleep(DISCONNECTED_SLEEP)
+                continue
+            for handler in self._handlers:
+                try:
+                    handler(message)
+                except Exception as e:
+                    log.error("Erreur dans le handler %s: %s", handler, e)
+
+
+_clients = {}
+_registry_lock = _thread.allocate_lock()
+
+
+def get_client(url, **kwargs):
+    """Retourne le client partagé pour cette URL (créé au premier appel)."""
+    with _registry_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = SharedWebSocketClient(url, **kwargs)
+            _clients[url] = client
+        return client
+
+
+def close_all():
+    with _registry_lock:
+        for client in _clients.values():
+            client.stop_dispatcher()
+            client.close()
+        _clients.clear()
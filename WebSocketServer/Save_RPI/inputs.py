@@ -0,0 +1,124 @@
+# inputs.py
+# Boutons gérés par interruptions : chaque front est horodaté dans un tampon
+# circulaire préalloué par l'IRQ, puis poll() (appelé à chaque tour de boucle)
+# applique l'anti-rebond par comparaison de ticks_ms et appelle les actions.
+#
+#   inputs = InputDispatcher(send=ws.send)
+#   inputs.add(12, BOTH, 30, '{"type": "dessin", "action": "mouseDown"}',
+#                            '{"type": "dessin", "action": "mouseUp"}')
+#   inputs.add(15, PRESS, 200, confirm_soluce)
+#   while True:
+#       inputs.poll()
+
+from array import array
+from machine import Pin
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:  # CPython
+    from mptime import ticks_ms, ticks_diff
+
+# Fronts surveillés (boutons en pull-up : appui = passage à 0)
+PRESS = 1
+RELEASE = 2
+BOTH = PRESS | RELEASE
+
+DEBOUNCE_MS = 30
+EVENT_QUEUE_SIZE = 32
+
+
+class InputDispatcher:
+    def __init__(self, send=None, queue_size=EVENT_QUEUE_SIZE):
+        # send(message) : utilisé pour les actions données sous forme de message
+        self.send = send
+        self._pins = []
+        self._edges = []
+        self._debounce = []
+        self._on_press = []
+        self._on_release = []
+        self._stable = []        # Dernier niveau accepté de chaque broche
+        self._last_change = []   # ticks_ms du dernier changement accepté
+        self._unsettled = []     # Fronts ignorés pendant l'anti-rebond
+
+        # File des fronts remplie par les IRQ : broche, niveau, horodatage
+        self._ev_input = array('B', [0] * queue_size)
+        self._ev_level = array('B', [0] * queue_size)
+        self._ev_time = array('L', [0] * queue_size)
+        self._head = 0
+        self._tail = 0
+        self.dropped = 0
+
+    def add(self, pin_no, edge=PRESS, debounce_ms=DEBOUNCE_MS, on_press=None, on_release=None,
+            pull=Pin.PULL_UP):
+        """
+        Déclare une entrée. on_press / on_release : message (str, envoyé tel
+        quel par send) ou fonction sans argument.
+        """
+        index = len(self._pins)
+        pin = Pin(pin_no, Pin.IN, pull)
+        self._pins.append(pin)
+        self._edges.append(edge)
+        self._debounce.append(debounce_ms)
+        self._on_press.append(on_press)
+        self._on_release.append(on_release)
+        self._stable.append(pin.value())
+        self._last_change.append(ticks_ms())
+        self._unsettled.append(False)
+        # Handler créé une fois ici : l'IRQ elle-même n'alloue rien
+        pin.irq(trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING,
+                handler=lambda p, i=index: self._push(i, p.value()))
+        return pin
+
+    def _push(self, index, level):
+        nxt = (self._head + 1) % len(self._ev_time)
+        if nxt == self._tail:
+            self.dropped += 1
+            return
+        self._ev_input[self._head] = index
+        self._ev_level[self._head] = level
+        self._ev_time[self._head] = ticks_ms()
+        self._head = nxt
+
+    def _change(self, index, level, now):
+        self._stable[index] = level
+        self._last_change[index] = now
+        if level == 0:
+            action = self._on_press[index] if self._edges[index] & PRESS else None
+        else:
+            action = self._on_release[index] if self._edges[index] & RELEASE else None
+        if action is None:
+            return
+        if isinstance(action, str):
+            self.send(action)
+        else:
+            action()
+
+    def poll(self):
+        """Traite les fronts reçus depuis le dernier appel."""
+        size = len(self._ev_time)
+        while self._tail != self._head:
+            i = self._tail
+            index = self._ev_input[i]
+            level = self._ev_level[i]
+            stamp = self._ev_time[i]
+            self._tail = (i + 1) % size
+
+            if ticks_diff(stamp, self._last_change[index]) < self._debounce[index]:
+                # Rebond : le niveau final sera vérifié à la fin de la fenêtre
+                self._unsettled[index] = True
+            elif level != self._stable[index]:
+                self._change(index, level, stamp)
+
+        # Fin de fenêtre d'anti-rebond : rattrape un relâchement (ou appui)
+        # dont le front est tombé pendant la fenêtre
+        now = ticks_ms()
+        for index in range(len(self._pins)):
+            if self._unsettled[index] and ticks_diff(now, self._last_change[index]) >= self._debounce[index]:
+                self._unsettled[index] = False
+                level = self._pins[index].value()
+                if level != self._stable[index]:
+                    self._change(index, level, now)
+
+    def is_pressed(self, index):
+        """État stable (après anti-rebond) de l'entrée d'indice donné."""
+        return self._stable[index] == 0
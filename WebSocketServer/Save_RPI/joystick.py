@@ -0,0 +1,284 @@
+# joystick.py
+# Calibration du joystick (sauvegardée en flash), échantillonnage (timer
+# matériel + filtre de suréchantillonnage) et envoi sur la route
+# controllerEsp : seulement quand la valeur change vraiment, avec un débit
+# plafonné et un dernier échantillon centré quand le joystick revient au repos.
+# Les échantillons partent en trames binaires de 8 octets (voir
+# joystick_frame.py) si le serveur accepte ce format, en JSON sinon.
+
+import json
+import time
+import log
+from array import array
+from joystick_frame import FRAME_SIZE, HELLO, encode_into, is_format_ack
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:  # CPython
+    from mptime import ticks_ms, ticks_diff
+
+# Variation minimale (en pas d'ADC) pour renvoyer une position, et débit maximal
+MIN_DELTA = 40
+MAX_RATE_HZ = 20
+
+# Échantillonnage : fréquence du timer et nombre de lectures filtrées
+SAMPLE_RATE_HZ = 500
+SAMPLE_WINDOW = 16
+
+# Calibration : fichier en flash, nombre de lectures au repos, et zone morte
+# = NOISE_FACTOR x écart maximal mesuré au repos (au moins MIN_DEAD_BAND)
+CALIBRATION_FILE = 'joystick_cal.json'
+CALIBRATION_SAMPLES = 200
+NOISE_FACTOR = 3
+MIN_DEAD_BAND = 60
+
+
+def calibrate(x_adc, y_adc, samples=CALIBRATION_SAMPLES, delay_ms=1):
+    """
+    Mesure la position de repos du joystick (à ne pas toucher pendant ~0,2 s).
+    Retourne un dict center_x, center_y, dead_band, et les bornes min/max
+    observées au repos sur chaque axe.
+    """
+    sum_x = sum_y = 0
+    min_x = min_y = 1 << 16
+    max_x = max_y = 0
+    for _ in range(samples):
+        x = x_adc.read()
+        y = y_adc.read()
+        sum_x += x
+        sum_y += y
+        min_x = min(min_x, x)
+        max_x = max(max_x, x)
+        min_y = min(min_y, y)
+        max_y = max(max_y, y)
+        time.sleep(delay_ms / 1000)
+
+    center_x = sum_x // samples
+    center_y = sum_y // samples
+    noise = max(max_x - center_x, center_x - min_x, max_y - center_y, center_y - min_y)
+    return {
+        "center_x": center_x,
+        "center_y": center_y,
+        "dead_band": max(MIN_DEAD_BAND, NOISE_FACTOR * noise),
+        "rest_x": [min_x, max_x],
+        "rest_y": [min_y, max_y],
+    }
+
+
+def save_calibration(calibration, path=CALIBRATION_FILE):
+    with open(path, 'w') as f:
+        json.dump(calibration, f)
+
+
+def load_calibration(path=CALIBRATION_FILE):
+    """Calibration sauvegardée, ou None si le fichier est absent ou illisible."""
+    try:
+        with open(path) as f:
+            calibration = json.load(f)
+    except (OSError, ValueError):
+        return None
+    for key in ("center_x", "center_y", "dead_band"):
+        if key not in calibration:
+            return None
+    return calibration
+
+
+class JoystickSampler:
+    """
+    Lit les deux axes du joystick sur un timer, indépendamment de la boucle
+    principale, dans un tampon circulaire préalloué. read() retourne la
+    moyenne glissante (ou la médiane) des SAMPLE_WINDOW dernières lectures :
+
+        sampler = JoystickSampler(xAxis, yAxis)
+        sampler.start()
+        x, y = sampler.read()
+    """
+
+    def __init__(self, x_adc, y_adc, rate_hz=SAMPLE_RATE_HZ, window=SAMPLE_WINDOW,
+                 use_median=False, timer_id=0):
+        self.x_adc = x_adc
+        self.y_adc = y_adc
+        self.rate_hz = rate_hz
+        self.use_median = use_median
+        self.timer_id = timer_id
+        self._timer = None
+
+        self._xs = array('H', [0] * window)
+        self._ys = array('H', [0] * window)
+        self._window = window
+        self._index = 0
+        self._count = 0
+        # Sommes glissantes : la moyenne ne coûte qu'une division à la lecture
+        self._sum_x = 0
+        self._sum_y = 0
+        self._sample_cb = self._sample  # Méthode liée créée une seule fois
+
+    def start(self):
+        from machine import Timer
+        self._timer = Timer(self.timer_id)
+        self._timer.init(freq=self.rate_hz, mode=Timer.PERIODIC, callback=self._sample_cb)
+
+    def stop(self):
+        if self._timer:
+            self._timer.deinit()
+            self._timer = None
+
+    def _sample(self, timer=None):
+        # Appelé par le timer : aucune allocation
+        x = self.x_adc.read()
+        y = self.y_adc.read()
+        i = self._index
+        if self._count < self._window:
+            self._count += 1
+        else:
+            self._sum_x -= self._xs[i]
+            self._sum_y -= self._ys[i]
+        self._xs[i] = x
+        self._ys[i] = y
+        self._sum_x += x
+        self._sum_y += y
+        i += 1
+        self._index = 0 if i == self._window else i
+
+    def read(self):
+        """Dernière valeur filtrée (x, y) ; lecture directe si aucun échantillon n'est encore arrivé."""
+        n = self._count
+        if not n:
+            return self.x_adc.read(), self.y_adc.read()
+        if self.use_median:
+            half = n // 2
+            return sorted(self._xs[:n])[half], sorted(self._ys[:n])[half]
+        return self._sum_x // n, self._sum_y // n
+
+
+class JoystickStreamer:
+    """
+    Décide, à chaque lecture du joystick, s'il faut l'envoyer :
+
+        streamer = JoystickStreamer(ws_controllerEsp, 1850, 1900, 200)
+        while True:
+            streamer.update(xAxis.read(), yAxis.read(), joystick_button.value())
+            streamer.handle_message(ws_controllerEsp.receive_nowait())
+
+    Le format binaire est proposé à chaque connexion (binary=False : toujours
+    du JSON) ; handle_message() doit voir passer les messages de la route
+    pour recevoir la réponse du serveur.
+    """
+
+    def __init__(self, ws, center_x, center_y, dead_band,
+                 min_delta=MIN_DELTA, max_rate_hz=MAX_RATE_HZ, binary=True):
+        self.ws = ws
+        self.center_x = center_x
+        self.center_y = center_y
+        self.dead_band = dead_band
+        self.min_delta = min_delta
+        self.min_interval_ms = 1000 // max_rate_hz if max_rate_hz else 0
+
+        # Dernier échantillon envoyé
+        self.last_x = center_x
+        self.last_y = center_y
+        self.last_button = None
+        self.last_send_ms = ticks_ms()
+        self.centered = True
+
+        # Format binaire : proposé à chaque (re)connexion, actif après accord
+        # du serveur. Trame préallouée, réécrite en place à chaque envoi.
+        self.binary = binary
+        self.binary_active = False
+        self._session = 0  # ws.connections lors de la dernière négociation
+        self._seq = 0
+        self._frame = bytearray(FRAME_SIZE)
+
+        # Statistiques : échantillons hors zone morte (tous envoyés avant),
+        # ceux réellement envoyés, total des messages et octets envoyés
+        self.samples = 0
+        self.moving_samples = 0
+        self.moving_sent = 0
+        self.sent = 0
+        self.bytes_sent = 0
+
+    def handle_message(self, message):
+        """Traite un message reçu sur la route ; True s'il s'agissait de l'accord sur le format."""
+        if message and self.binary and is_format_ack(message):
+            self.binary_active = True
+            log.info("Joystick : format binaire accepté par le serveur")
+            return True
+        return False
+
+    def _check_link(self):
+        # Nouvelle session (même après une coupure brève entre deux lectures) :
+        # retour au JSON jusqu'à la réponse du serveur
+        session = self.ws.connections
+        if session == self._session:
+            return
+        self._session = session
+        self.binary_active = False
+        if self.ws.connected and self.binary:
+            self.ws.send(HELLO, replay=False)
+
+    def _send(self, x, y, button, now, flush=False):
+        # replay=False : un échantillon périmé n'est pas rejoué après une
+        # coupure. Retourne False si l'envoi a échoué : rien n'est mis à jour
+        # et l'échantillon sera retenté à la lecture suivante.
+        if self.binary_active:
+            payload = encode_into(self._frame, self._seq, x, y, button)
+            self._seq = (self._seq + 1) & 0xFFFF
+        else:
+            payload = json.dumps({"x": x, "y": y, "button": button})
+        if not self.ws.send(payload, replay=False):
+            return False
+        # En mode regroupé send() n'a fait que mettre la trame en attente
+        if flush and not self.ws.flush():
+            return False
+        if __debug__:
+            log.debug("Joystick x=%d y=%d bouton=%d", x, y, button)
+        self.last_x = x
+        self.last_y = y
+        self.last_button = button
+        self.last_send_ms = now
+        self.sent += 1
+        self.bytes_sent += len(payload)
+        return True
+
+    def update(self, x, y, button):
+        """Traite une lecture ; retourne True si un message a été envoyé."""
+        self.samples += 1
+        self._check_link()
+        now = ticks_ms()
+        moving = (abs(x - self.center_x) > self.dead_band
+                  or abs(y - self.center_y) > self.dead_band)
+        if moving:
+            self.moving_samples += 1
+
+        if ticks_diff(now, self.last_send_ms) < self.min_interval_ms:
+            return False
+
+        if moving:
+            if (abs(x - self.last_x) <= self.min_delta
+                    and abs(y - self.last_y) <= self.min_delta
+                    and button == self.last_button):
+                return False
+            if not self._send(x, y, button, now):
+                return False
+            self.centered = False
+            self.moving_sent += 1
+            return True
+
+        # Retour au repos : un échantillon centré, renvoyé tant qu'il n'est pas
+        # parti (envoyé tout de suite, sans attendre le flush() de la boucle)
+        if not self.centered or button != self.last_button:
+            if not self._send(self.center_x, self.center_y, button, now, flush=True):
+                return False
+            self.centered = True
+            return True
+        return False
+
+    def stats(self):
+        """Trafic économisé par rapport à l'envoi de chaque échantillon hors zone morte."""
+        return {
+            "samples": self.samples,
+            "moving": self.moving_samples,
+            "sent": self.sent,
+            "saved": self.moving_samples - self.moving_sent,
+            "bytes_sent": self.bytes_sent,
+        }
@@ -0,0 +1,78 @@
+# joystick_frame.py
+# Trame binaire du joystick sur la route controllerEsp (remplace le JSON
+# {"x": ..., "y": ..., "button": ...} une fois le format négocié).
+#
+# 8 octets, petit-boutiste, envoyés en trame WebSocket binaire :
+#
+#   octet 0     type    0x01 (échantillon de joystick)
+#   octet 1     flags   bit 0 : bouton du joystick (valeur brute de la broche)
+#   octets 2-3  seq     uint16, incrémenté à chaque trame (revient à 0 après 65535)
+#   octets 4-5  x       int16, valeur de l'ADC
+#   octets 6-7  y       int16, valeur de l'ADC
+#
+# Négociation : à chaque connexion la carte envoie en texte
+#   {"type": "hello", "formats": ["bin1", "json"]}
+# et passe en binaire quand le serveur répond {"type": "format", "format": "bin1"}.
+# Un serveur qui ne répond pas continue de recevoir du JSON.
+#
+# decode() est le décodeur de référence (serveur, banc de test sur PC) ;
+# lancer ce fichier sous CPython vérifie les trames de FIXTURES.
+
+import struct
+
+FORMAT_NAME = "bin1"
+FRAME_FORMAT = "<BBHhh"
+FRAME_SIZE = 8
+FRAME_TYPE_JOYSTICK = 0x01
+FLAG_BUTTON = 0x01
+
+HELLO = '{"type": "hello", "formats": ["bin1", "json"]}'
+
+
+def encode_into(buf, seq, x, y, button):
+    """Écrit une trame dans buf (bytearray de FRAME_SIZE octets), sans allocation."""
+    struct.pack_into(FRAME_FORMAT, buf, 0, FRAME_TYPE_JOYSTICK,
+                     FLAG_BUTTON if button else 0, seq & 0xFFFF, x, y)
+    return buf
+
+
+def decode(data):
+    """Décode une trame ; retourne un dict seq, x, y, button ou lève ValueError."""
+    if len(data) != FRAME_SIZE:
+        raise ValueError("taille de trame invalide: {}".format(len(data)))
+    kind, flags, seq, x, y = struct.unpack(FRAME_FORMAT, data)
+    if kind != FRAME_TYPE_JOYSTICK:
+        raise ValueError("type de trame inconnu: {}".format(kind))
+    return {"seq": seq, "x": x, "y": y, "button": flags & FLAG_BUTTON}
+
+
+def is_format_ack(message):
+    """True si message est la réponse du serveur acceptant le format binaire."""
+    if not isinstance(message, str) or FORMAT_NAME not in message:
+        return False
+    import json
+    try:
+        data = json.loads(message)
+    except ValueError:
+        return False
+    return data.get("type") == "format" and data.get("format") == FORMAT_NAME
+
+
+# Trames de référence : (octets, valeur décodée)
+FIXTURES = (
+    (b'\x01\x01\x00\x00\x3a\x07\x6c\x07', {"seq": 0, "x": 1850, "y": 1900, "button": 1}),
+    (b'\x01\x00\x01\x00\x00\x00\xff\x0f', {"seq": 1, "x": 0, "y": 4095, "button": 0}),
+    (b'\x01\x01\xff\xff\xff\x0f\x00\x00', {"seq": 65535, "x": 4095, "y": 0, "button": 1}),
+    (b'\x01\x00\x34\x12\xff\xff\x00\x80', {"seq": 0x1234, "x": -1, "y": -32768, "button": 0}),
+)
+
+
+if __name__ == "__main__":
+    buf = bytearray(FRAME_SIZE)
+    for raw, expected in FIXTURES:
+        assert decode(raw) == expected, (raw, decode(raw))
+        encode_into(buf, expected["seq"], expected["x"], expected["y"], expected["button"])
+        assert bytes(buf) == raw, (bytes(buf), raw)
+    assert is_format_ack('{"type": "format", "format": "bin1"}')
+    assert not is_format_ack('{"type": "format", "format": "json"}')
+    print("{} trames de référence OK".format(len(FIXTURES)))
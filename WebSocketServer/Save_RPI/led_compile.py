@@ -0,0 +1,166 @@
+# led_compile.py
+# Compilateur d'animations, à lancer sur PC (CPython) : joue un effet de
+# leds.py sur un bandeau simulé et enregistre ses trames dans un fichier .led
+# (format décrit dans led_player.py), à copier sur la carte.
+#
+#   python led_compile.py rainbow_cycle_frames rainbow.led
+#   python led_compile.py breathing_red_effect_frames breath.led --arg duration=20 --seed 1
+#   python led_compile.py rainbow_cycle_frames rainbow.led --config buzzers/led_config.py
+#
+# Les trames sont calculées avec la configuration du bandeau de la carte
+# cible (led_config.py) et stockées dans l'ordre de ses octets. Chaque trame
+# est enregistrée en DELTA (plages modifiées) quand c'est plus court qu'en
+# RAW, sauf avec --raw. Le temps des effets (time.ticks_ms) est virtuel : il
+# avance de la durée de chaque trame, une animation de 10 s est donc
+# compilée en quelques secondes et produit les mêmes trames que sur la carte.
+# Le bandeau est celui du simulateur bench/host/neopixel.py.
+
+import argparse
+import os
+import random
+import struct
+import sys
+import types
+
+from led_player import (MAGIC, VERSION, HEADER_FORMAT, FRAME_FORMAT, RUN_FORMAT,
+                        RUN_SIZE, KIND_RAW, KIND_DELTA)
+
+# Garde-fou pour les effets sans fin
+MAX_FRAMES = 10000
+
+
+class _Clock:
+    """Remplace le module time de leds.py : ticks_ms avance avec les trames."""
+
+    def __init__(self):
+        self.ms = 0
+
+    def ticks_ms(self):
+        return self.ms
+
+    def ticks_add(self, ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(self, a, b):
+        return a - b
+
+
+def _load_leds(config_path):
+    """Importe leds.py sur PC, avec le led_config.py de la carte cible."""
+    # Simulateur de machine.Pin et neopixel des bancs de test (bench/host)
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench", "host"))
+    if config_path:
+        config = types.ModuleType("led_config")
+        with open(config_path) as f:
+            exec(f.read(), config.__dict__)
+        sys.modules["led_config"] = config
+    import leds
+    leds.time = _Clock()
+    return leds
+
+
+def delta_runs(prev, cur):
+    """Plages (début, fin) en octets où cur diffère de prev ; deux plages
+    séparées de moins d'un en-tête de plage sont fusionnées."""
+    runs = []
+    n = len(cur)
+    i = 0
+    while i < n:
+        if prev[i] == cur[i]:
+            i += 1
+            continue
+        start = i
+        end = i + 1
+        j = end
+        while j < n and j - end < RUN_SIZE:
+            if prev[j] != cur[j]:
+                end = j + 1
+            j += 1
+        runs.append((start, end))
+        i = end
+    return runs
+
+
+def encode_delta(prev, cur):
+    out = bytearray()
+    for start, end in delta_runs(prev, cur):
+        out += struct.pack(RUN_FORMAT, start, end - start)
+        out += cur[start:end]
+    return out
+
+
+def compile_frames(frames, np, color_order, out, delta=True, clock=None, max_frames=MAX_FRAMES):
+    """
+    Écrit dans out (fichier binaire) les trames du générateur frames, rendues
+    dans np.buf. Retourne (trames, taille en octets).
+    """
+    out.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, np.bpp,
+                          color_order.encode(), np.n, 0))
+    size = struct.calcsize(HEADER_FORMAT)
+    prev = None
+    count = 0
+    for delay in frames:
+        if count == max_frames:
+            raise ValueError("plus de {} trames : effet sans fin ?".format(max_frames))
+        cur = bytes(np.buf)
+        kind, payload = KIND_RAW, cur
+        if delta and prev is not None:
+            encoded = encode_delta(prev, cur)
+            if len(encoded) < len(cur):
+                kind, payload = KIND_DELTA, encoded
+        out.write(struct.pack(FRAME_FORMAT, kind, int(round(delay * 1000000)), len(payload)))
+        out.write(payload)
+        size += struct.calcsize(FRAME_FORMAT) + len(payload)
+        prev = cur
+        count += 1
+        if clock is not None:
+            clock.ms += int(delay * 1000)
+
+    # Nombre de trames, connu seulement à la fin
+    out.seek(0)
+    out.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, np.bpp,
+                          color_order.encode(), np.n, count))
+    return count, size
+
+
+def _value(text):
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Précalcule une animation de leds.py en fichier .led")
+    parser.add_argument("effect", help="générateur de trames de leds.py (ex. rainbow_cycle_frames)")
+    parser.add_argument("output", help="fichier .led à écrire")
+    parser.add_argument("--arg", action="append", default=[], metavar="NOM=VALEUR",
+                        help="paramètre de l'effet (répétable)")
+    parser.add_argument("--config", help="led_config.py de la carte cible")
+    parser.add_argument("--raw", action="store_true", help="trames complètes uniquement (pas de DELTA)")
+    parser.add_argument("--seed", type=int, help="graine des effets aléatoires")
+    args = parser.parse_args(argv)
+
+    leds = _load_leds(args.config)
+    if args.seed is not None:
+        random.seed(args.seed)
+    kwargs = {}
+    for item in args.arg:
+        name, _, text = item.partition("=")
+        kwargs[name] = _value(text)
+
+    frames = getattr(leds, args.effect)(**kwargs)
+    with open(args.output, "wb") as out:
+        count, size = compile_frames(frames, leds.strip(), leds.COLOR_ORDER, out,
+                                     delta=not args.raw, clock=leds.time)
+    raw = count * leds.NUM_PIXELS * len(leds.COLOR_ORDER)
+    print("{} : {} trames, {} octets ({:.0f}% du brut)".format(
+        args.output, count, size, 100 * size / raw if raw else 0))
+
+
+if __name__ == "__main__":
+    main()
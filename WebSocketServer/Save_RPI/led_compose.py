@@ -0,0 +1,149 @@
+# led_compose.py
+# Moteur de composition LED : un effet est décrit par des données (un fond et
+# des trains de sprites) et tout ce qui peut l'être est calculé une fois.
+#
+#   TRIPLE_COMET = {
+#       "background": [(127, 0, 0), (0, 0, 0)],      # motif répété
+#       "layers": [{"count": 3, "length": 10, "gap": 15,
+#                   "color": (255, 255, 255), "scale": 0.4}],
+#   }
+#   animator.play(led_compose.frames(renderer, TRIPLE_COMET, delay=0.02))
+#
+# Un calque est un train de `count` sprites de `length` pixels séparés de
+# `gap` pixels transparents. Chaque sprite est un dégradé linéaire de
+# `color` (255 - k * (255 // length)) multiplié par `scale`, plus lumineux
+# du côté `head` ("back" : premier pixel, "front" : dernier). Le train part
+# du pixel `start` et avance de `speed` pixels par trame ; `blend` choisit le
+# mélange entier avec le fond : "replace", "add" (saturé) ou "max".
+#
+# Si l'effet n'a qu'un calque et que le fond est un motif court, le calque
+# est précomposé sur le fond pour chaque phase du motif : une trame ne coûte
+# alors qu'une copie de tranche, quel que soit le nombre de sprites. Un calque
+# précomposé couvre toute son étendue, intervalles compris, et ne peut donc
+# pas se superposer à un autre : avec plusieurs calques (ou un fond non
+# périodique) les sprites sont mélangés au tampon courant à chaque trame.
+
+# Taille maximale (octets) des calques précomposés d'une composition
+PRECOMPOSE_MAX = 8192
+
+BLEND_REPLACE = 0
+BLEND_ADD = 1
+BLEND_MAX = 2
+_BLENDS = {"replace": BLEND_REPLACE, "add": BLEND_ADD, "max": BLEND_MAX}
+
+
+def _blend(mode, bg, fg):
+    if mode == BLEND_ADD:
+        v = bg + fg
+        return 255 if v > 255 else v
+    if mode == BLEND_MAX:
+        return fg if fg > bg else bg
+    return fg
+
+
+class _Layer:
+    def __init__(self, renderer, spec):
+        length = spec.get("length", 10)
+        count = spec.get("count", 1)
+        gap = spec.get("gap", 0)
+        color = spec.get("color", (255, 255, 255))
+        scale = spec.get("scale", 1)
+        self.blend = _BLENDS[spec.get("blend", "replace")]
+        self.start = spec.get("start", 0)
+        self.speed = spec.get("speed", 1)
+        self.count = count
+        self.pitch = length + gap
+        self.length = length
+        self.span = count * length + (count - 1) * gap
+
+        # Dégradé calculé une fois (luminosité, couleur puis facteur d'échelle)
+        step = 255 // length
+        levels = [255 - k * step for k in range(length)]
+        if spec.get("head", "back") == "front":
+            levels.reverse()
+        pixels = [tuple(int(c * level // 255 * scale) for c in color) for level in levels]
+        self.sprite = renderer.segment(pixels)
+
+
+class Composition:
+    def __init__(self, renderer, effect):
+        self.renderer = renderer
+        background = effect.get("background", [(0, 0, 0)])
+        renderer.set_background(background)
+        self.period = len(background)
+        self.layers = [_Layer(renderer, spec) for spec in effect.get("layers", ())]
+        span = max([layer.span for layer in self.layers] or [0])
+        self.frame_count = effect.get("frames") or renderer.n + span
+
+        # Précomposition : calque unique mélangé au fond pour chaque phase du
+        # motif (plusieurs calques doivent se mélanger entre eux)
+        self._composed = None
+        if len(self.layers) == 1 and self.period < renderer.n:
+            layer = self.layers[0]
+            if self.period * layer.span * renderer.bpp <= PRECOMPOSE_MAX:
+                self._composed = [self._precompose(layer)]
+
+    def _precompose(self, layer):
+        bpp = self.renderer.bpp
+        bg = self.renderer.background
+        sprite = layer.sprite
+        phases = []
+        for phase in range(self.period):
+            seg = bytearray(layer.span * bpp)
+            for m in range(layer.span):
+                src = ((phase + m) % self.period) * bpp
+                seg[m * bpp:(m + 1) * bpp] = bg[src:src + bpp]
+            for j in range(layer.count):
+                base = j * layer.pitch * bpp
+                for b in range(layer.length * bpp):
+                    seg[base + b] = _blend(layer.blend, seg[base + b], sprite[b])
+            phases.append(memoryview(seg))
+        return phases
+
+    def _blend_sprite(self, layer, pos):
+        # Mélange à la volée d'un sprite avec le contenu courant du tampon
+        # (fond non périodique)
+        r = self.renderer
+        bpp = r.bpp
+        if layer.blend == BLEND_REPLACE:
+            r.blit(pos, layer.sprite)
+            return
+        lo = pos if pos > 0 else 0
+        hi = pos + layer.length
+        if hi > r.n:
+            hi = r.n
+        if lo >= hi:
+            return
+        buf = r.buf
+        sprite = layer.sprite
+        for b in range(lo * bpp, hi * bpp):
+            buf[b] = _blend(layer.blend, buf[b], sprite[b - pos * bpp])
+        r.mark(lo, hi)
+
+    def frames(self, delay=0.02):
+        """Générateur de trames (voir animation.py)."""
+        r = self.renderer
+        r.show_background()
+        composed = self._composed
+        for i in range(self.frame_count):
+            r.begin_frame()
+            for index, layer in enumerate(self.layers):
+                # pos : premier sprite du train, les suivants le suivent à
+                # `pitch` pixels d'écart
+                pos = layer.start + i * layer.speed
+                if composed is not None:
+                    tail = pos - (layer.count - 1) * layer.pitch
+                    r.blit(tail, composed[index][tail % self.period])
+                else:
+                    for j in range(layer.count):
+                        self._blend_sprite(layer, pos - j * layer.pitch)
+            yield delay
+
+
+def frames(renderer, effect, delay=0.02):
+    """
+    Générateur de trames d'un effet décrit par des données ; la composition
+    n'est préparée qu'à la première trame (donc après l'arrêt de l'animation
+    précédente, qui utilise le même fond).
+    """
+    yield from Composition(renderer, effect).frames(delay)
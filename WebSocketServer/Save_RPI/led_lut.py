@@ -0,0 +1,105 @@
+# led_lut.py
+# Tables précalculées pour les effets LED : la boucle interne d'un effet ne
+# fait plus que des accès indexés par des entiers (ni tuple, ni flottant).
+#
+#   WHEEL : roue des couleurs arc-en-ciel, 256 entrées de 3 octets (R, G, B)
+#   SIN8  : sinus sur un tour (256 pas), ramené à 0..255 (sin * 0.5 + 0.5)
+#
+# Gamma et luminosité globale : gamma_curve() calcule une fois la courbe
+# (16 bits), brightness_table() en tire la table de 256 octets d'une
+# luminosité en arithmétique entière, et translate() y fait passer un tampon
+# complet au moment de l'envoi au bandeau.
+#
+# Les phases sont des accumulateurs 16 bits en virgule fixe (8.8) : un tour
+# vaut 65536, l'octet de poids fort indexe SIN8, et la vitesse en rad/trame
+# se convertit avec phase_step().
+
+import math
+from array import array
+
+PHASE_ONE_TURN = 65536
+GAMMA = 2.2  # Correction usuelle des WS2812 (fondus réguliers à l'œil)
+
+
+def _wheel(pos):
+    if pos < 85:
+        return (pos * 3, 255 - pos * 3, 0)
+    elif pos < 170:
+        pos -= 85
+        return (255 - pos * 3, 0, pos * 3)
+    else:
+        pos -= 170
+        return (0, pos * 3, 255 - pos * 3)
+
+
+def _build_wheel():
+    table = bytearray(256 * 3)
+    for pos in range(256):
+        table[pos * 3:pos * 3 + 3] = bytes(_wheel(pos))
+    return bytes(table)
+
+
+def _build_sin8():
+    table = bytearray(256)
+    for i in range(256):
+        table[i] = int((math.sin(2 * math.pi * i / 256) * 0.5 + 0.5) * 255 + 0.5)
+    return bytes(table)
+
+
+WHEEL = _build_wheel()
+SIN8 = _build_sin8()
+
+
+def wheel_table(order=(1, 0, 2), bpp=3):
+    """
+    WHEEL réordonnée pour un bandeau (NeoPixel.ORDER, octets par pixel) :
+    l'entrée k se copie telle quelle dans np.buf[i * bpp:(i + 1) * bpp].
+    """
+    table = bytearray(256 * bpp)
+    for pos in range(256):
+        for c in range(3):
+            table[pos * bpp + order[c]] = WHEEL[pos * 3 + c]
+    return memoryview(table)
+
+
+def phase(radians):
+    """Angle en radians -> phase 16 bits."""
+    return int(radians * PHASE_ONE_TURN / (2 * math.pi)) & 0xFFFF
+
+
+def phase_step(radians_per_frame):
+    """Vitesse en rad/trame -> incrément de phase 16 bits par trame."""
+    return int(radians_per_frame * PHASE_ONE_TURN / (2 * math.pi) + 0.5)
+
+
+def gamma_curve(gamma=GAMMA):
+    """Courbe v -> (v / 255) ** gamma, sur 16 bits (0..65535)."""
+    return array('H', [int(65535 * (v / 255) ** gamma + 0.5) for v in range(256)])
+
+
+def brightness_table(level, curve, out=None):
+    """
+    Table de 256 octets : gamma puis luminosité level (0..255), calculée en
+    entiers depuis curve (gamma_curve()) ; remplit out s'il est fourni.
+    """
+    if out is None:
+        out = bytearray(256)
+    scale_table(curve, out, level)
+    return out
+
+
+def _scale_table_portable(curve, out, level):
+    for v in range(256):
+        out[v] = (curve[v] * level + 32768) >> 16
+
+
+def _translate_portable(src, dst, lut, n):
+    for i in range(n):
+        dst[i] = lut[src[i]]
+
+
+try:
+    from led_translate import translate, scale_table  # Variantes viper (ESP32)
+except (ImportError, SyntaxError):
+    translate = _translate_portable
+    scale_table = _scale_table_portable
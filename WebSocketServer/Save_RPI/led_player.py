@@ -0,0 +1,74 @@
+# led_player.py
+# Lecture d'animations précalculées (fichiers .led produits sur PC par
+# led_compile.py) : chaque trame est lue depuis la flash directement dans le
+# tampon du bandeau avec readinto, sans rien recalculer.
+#
+#   animator.play(led_player.frames("rainbow.led", leds.strip()), on_done=leds.release)
+#
+# Format (petit-boutiste) :
+#
+#   en-tête   "<4sBB4sHH" : "LEDF", version, octets par pixel, ordre des
+#             couleurs ("GRB\0"...), nombre de LEDs, nombre de trames
+#   trame     "<BIH" : type, durée d'affichage en µs, taille des données
+#             RAW   : le tampon complet (LEDs * octets par pixel), dans
+#                     l'ordre des octets du bandeau
+#             DELTA : plages modifiées depuis la trame précédente, chacune
+#                     "<HH" (décalage en octets, longueur) suivi des octets
+#
+# Les trames DELTA dépendent de la précédente : un fichier se lit toujours
+# depuis le début, et les trames sautées par l'Animator sont lues quand même.
+
+import struct
+from led_render import order_tuple
+
+MAGIC = b"LEDF"
+VERSION = 1
+HEADER_FORMAT = "<4sBB4sHH"
+HEADER_SIZE = 14
+FRAME_FORMAT = "<BIH"
+FRAME_SIZE = 7
+RUN_FORMAT = "<HH"
+RUN_SIZE = 4
+
+KIND_RAW = 0
+KIND_DELTA = 1
+
+
+def read_header(f):
+    """Retourne (octets par pixel, ordre des couleurs, LEDs, trames) ; ValueError si invalide."""
+    head = f.read(HEADER_SIZE)
+    if len(head) != HEADER_SIZE:
+        raise ValueError("en-tête tronqué")
+    magic, version, bpp, order, n, count = struct.unpack(HEADER_FORMAT, head)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("fichier d'animation inconnu")
+    return bpp, order[:bpp].decode(), n, count
+
+
+def frames(path, np):
+    """
+    Générateur de trames (voir animation.py) lisant le fichier path dans
+    np.buf. Le bandeau doit avoir la géométrie pour laquelle le fichier a été
+    compilé (LEDs, octets par pixel, ordre des couleurs).
+    """
+    with open(path, "rb") as f:
+        bpp, color_order, n, count = read_header(f)
+        if n != np.n or bpp != np.bpp or \
+                order_tuple(color_order) != tuple(getattr(np, "ORDER", (1, 0, 2, 3))[:bpp]):
+            raise ValueError("{} : compilé pour {} LEDs {}".format(path, n, color_order))
+
+        buf = memoryview(np.buf)
+        rec = bytearray(FRAME_SIZE)
+        run = bytearray(RUN_SIZE)
+        for _ in range(count):
+            f.readinto(rec)
+            kind, delay_us, size = struct.unpack(FRAME_FORMAT, rec)
+            if kind == KIND_RAW:
+                f.readinto(buf)
+            else:
+                while size > 0:
+                    f.readinto(run)
+                    offset, length = struct.unpack(RUN_FORMAT, run)
+                    f.readinto(buf[offset:offset + length])
+                    size -= RUN_SIZE + length
+            yield delay_us / 1000000
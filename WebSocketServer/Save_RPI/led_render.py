@@ -0,0 +1,114 @@
+# led_render.py
+# Rendu direct dans le tampon du bandeau (NeoPixel.buf), sans tuples ni
+# boucle pixel par pixel :
+#
+#   renderer = StripRenderer(np)
+#   renderer.set_background([(127, 0, 0), (0, 0, 0)])   # motif répété, une fois
+#   comet = renderer.segment([(255, 255, 255), (128, 128, 128)])
+#   renderer.show_background()
+#   while ...:
+#       renderer.begin_frame()          # restaure le fond sous la trame précédente
+#       renderer.blit(pos, comet)       # copie de tranche, bornée au bandeau
+#       np.write()
+#
+# Les couleurs sont converties une fois dans l'ordre des octets du bandeau
+# (GRB pour les WS2812) ; chaque trame ne fait ensuite que des copies de
+# tranches de memoryview. Seule la zone modifiée par la trame précédente
+# (plage sale) est restaurée depuis le fond préconstruit.
+
+
+def order_tuple(color_order):
+    """"GRB" -> position de R, G, B (et W) dans les octets d'un pixel (NeoPixel.ORDER)."""
+    return tuple(color_order.index(c) for c in "RGBW"[:len(color_order)])
+
+
+class StripRenderer:
+    def __init__(self, np):
+        self.np = np
+        self.n = np.n
+        self.bpp = np.bpp
+        # Position de R, G, B (et W) dans les octets d'un pixel : NeoPixel.ORDER
+        self.order = getattr(np, 'ORDER', (1, 0, 2, 3))
+        self.buf = memoryview(np.buf)
+        self._bg = bytearray(len(np.buf))
+        self.background = memoryview(self._bg)
+        # Plage sale [lo, hi[ en pixels (vide si lo >= hi)
+        self.lo = 0
+        self.hi = 0
+
+    def color_bytes(self, color):
+        """Octets d'un pixel dans l'ordre du bandeau."""
+        px = bytearray(self.bpp)
+        for i in range(self.bpp):
+            px[self.order[i]] = color[i] if i < len(color) else 0
+        return px
+
+    def segment(self, colors):
+        """Tranche de pixels préconvertie, à copier avec blit()."""
+        bpp = self.bpp
+        seg = bytearray(len(colors) * bpp)
+        for i, color in enumerate(colors):
+            seg[i * bpp:(i + 1) * bpp] = self.color_bytes(color)
+        return memoryview(seg)
+
+    def _repeat(self, dst, start, end, pattern):
+        # Copie pattern en [start, end[ puis double la zone remplie à chaque
+        # passe : log2(n) copies de tranches au lieu d'une boucle par pixel
+        bpp = self.bpp
+        a = start * bpp
+        b = end * bpp
+        filled = min(len(pattern), b - a)
+        dst[a:a + filled] = pattern[:filled]
+        while a + filled < b:
+            count = min(filled, b - a - filled)
+            dst[a + filled:a + filled + count] = dst[a:a + count]
+            filled += count
+
+    def set_background(self, colors):
+        """Fond de l'animation : liste de couleurs répétée sur tout le bandeau."""
+        self._repeat(self.background, 0, self.n, self.segment(colors))
+
+    def show_background(self):
+        """Copie tout le fond dans le bandeau."""
+        self.buf[:] = self.background
+        self.lo = self.hi = 0
+
+    def fill(self, color, start=0, end=None):
+        """Remplit [start, end[ d'une couleur (plus rapide que np.fill)."""
+        if end is None:
+            end = self.n
+        self._repeat(self.buf, start, end, self.color_bytes(color))
+        self.mark(start, end)
+
+    def mark(self, lo, hi):
+        """Ajoute [lo, hi[ à la plage sale (pixels modifiés hors blit/fill)."""
+        if self.lo >= self.hi:
+            self.lo = lo
+            self.hi = hi
+        else:
+            if lo < self.lo:
+                self.lo = lo
+            if hi > self.hi:
+                self.hi = hi
+
+    def begin_frame(self):
+        """Restaure le fond sur la plage modifiée par la trame précédente."""
+        if self.lo < self.hi:
+            a = self.lo * self.bpp
+            b = self.hi * self.bpp
+            self.buf[a:b] = self.background[a:b]
+        self.lo = self.hi = 0
+
+    def blit(self, pos, seg):
+        """Copie seg (issu de segment()) à partir du pixel pos, en coupant aux bords."""
+        bpp = self.bpp
+        length = len(seg) // bpp
+        start = pos if pos > 0 else 0
+        end = pos + length
+        if end > self.n:
+            end = self.n
+        if start >= end:
+            return
+        skip = (start - pos) * bpp
+        self.buf[start * bpp:end * bpp] = seg[skip:skip + (end - start) * bpp]
+        self.mark(start, end)
@@ -0,0 +1,31 @@
+# led_translate.py
+# Passage du tampon du bandeau dans une table de 256 octets (gamma et
+# luminosité, voir led_lut.py) et calcul de cette table, en émetteur viper,
+# importé par led_lut.py quand le firmware le supporte. Le code viper est
+# isolé dans ce module car un port sans émetteur natif refuse de compiler le
+# fichier entier.
+
+import micropython
+
+
+@micropython.viper
+def translate(src, dst, lut, n: int):
+    """dst[i] = lut[src[i]] pour i < n (src, dst et lut : bytearray ou bytes)."""
+    s = ptr8(src)
+    d = ptr8(dst)
+    t = ptr8(lut)
+    i = 0
+    while i < n:
+        d[i] = t[s[i]]
+        i += 1
+
+
+@micropython.viper
+def scale_table(curve, out, level: int):
+    """out[v] = (curve[v] * level + 32768) >> 16 pour v < 256 (curve : array('H'), out : bytearray)."""
+    c = ptr16(curve)
+    o = ptr8(out)
+    v = 0
+    while v < 256:
+        o[v] = (c[v] * level + 32768) >> 16
+        v += 1
@@ -1,31 +1,141 @@
 #
-//  leds.py
-//  WebSocketServer
-//
-//  Created by digital on 08/01/2025.
-//
+#  leds.py
+#  WebSocketServer
+#
+#  Created by digital on 08/01/2025.
+#
+#  Chaque animation existe en deux versions : xxx_frames(...) est un générateur
+#  qui dessine une trame dans le bandeau puis cède sa durée d'affichage (en s),
+#  à faire tourner par animation.Animator sans bloquer ; xxx(...) la joue
+#  jusqu'au bout.
+#
+#  Module commun à toutes les cartes (contrôleur, buzzers, dancepad) : broche,
+#  longueur et ordre des couleurs viennent du led_config.py de la carte. Rien
+#  n'est alloué à l'import : le bandeau (NUM_PIXELS * bpp octets), le fond du
+#  rendu et les tables des effets sont créés à la première trame, et release()
+#  les libère quand plus aucune animation ne tourne.
+#
+#    animator = Animator(leds.write)
+#    animator.play(leds.blink_thirty_percent_white_frames(), on_done=leds.release)
 
 from machine import Pin
 import neopixel
+import gc
 import time
 import random
-import math
+from array import array
+from animation import play_blocking
+from led_render import StripRenderer, order_tuple
+import led_compose
+
+try:
+    import led_config
+except ImportError:  # Pas de led_config.py : bandeau du contrôleur principal
+    led_config = None
 
 # Configuration
-LED_PIN = 2          # GPIO où le bandeau LED est connecté
-NUM_PIXELS = 300     # Nombre de LEDs dans le bandeau (ajustez selon votre bandeau)
-np = neopixel.NeoPixel(Pin(LED_PIN), NUM_PIXELS)
+LED_PIN = getattr(led_config, "LED_PIN", 2)              # GPIO où le bandeau LED est connecté
+NUM_PIXELS = getattr(led_config, "NUM_PIXELS", 300)      # Nombre de LEDs dans le bandeau
+COLOR_ORDER = getattr(led_config, "COLOR_ORDER", "GRB")  # Ordre des octets d'un pixel ("GRB", "RGB", "GRBW"...)
+BRIGHTNESS = getattr(led_config, "BRIGHTNESS", 255)      # Luminosité globale de départ (0..255)
+GAMMA = getattr(led_config, "GAMMA", 1.0)                # Correction gamma (1.0 : aucune)
+
+_np = None
+_renderer = None
+_wheel_strip = None
+# Luminosité et gamma appliqués à l'envoi : table de 256 octets (None si
+# aucune correction) et tampon de sortie, pour ne pas toucher aux trames
+_brightness = None
+_gamma = GAMMA
+_curve = None
+_lut = None
+_out = None
+
+
+def strip():
+    """Bandeau NeoPixel, créé à la première utilisation."""
+    global _np
+    if _np is None:
+        # Tampon d'un seul bloc : compacter le tas avant de le demander
+        gc.collect()
+        _np = neopixel.NeoPixel(Pin(LED_PIN), NUM_PIXELS, bpp=len(COLOR_ORDER))
+        _np.ORDER = order_tuple(COLOR_ORDER)
+        if _brightness is None:
+            set_brightness(BRIGHTNESS)
+    return _np
+
+
+def renderer():
+    """Rendu direct dans le tampon du bandeau (led_render), créé à la première utilisation."""
+    global _renderer
+    if _renderer is None:
+        _renderer = StripRenderer(strip())
+    return _renderer
+
+
+def set_brightness(level, gamma=None):
+    """
+    Luminosité globale (0..255) et, si donné, gamma ; appliqués à chaque
+    envoi au bandeau, les effets dessinent toujours en pleine échelle.
+    """
+    global _brightness, _gamma, _curve, _lut
+    _brightness = level
+    if gamma is not None and gamma != _gamma:
+        _gamma = gamma
+        _curve = None
+    if level >= 255 and _gamma == 1:
+        _lut = None  # Envoi direct du tampon
+        return
+    from led_lut import gamma_curve, brightness_table
+    if _curve is None:
+        _curve = gamma_curve(_gamma)
+    _lut = brightness_table(level, _curve, _lut)
+
+
+def write():
+    """Envoie le tampon au bandeau (à passer à Animator), corrigé par la table de luminosité."""
+    global _out
+    np = strip()
+    if _lut is None:
+        np.write()
+        return
+    from led_lut import translate
+    buf = np.buf
+    if _out is None:
+        _out = bytearray(len(buf))
+    translate(buf, _out, _lut, len(buf))
+    # NeoPixel.write() envoie np.buf : le tampon corrigé le remplace le
+    # temps de l'envoi, la trame de l'effet reste intacte
+    np.buf = _out
+    try:
+        np.write()
+    finally:
+        np.buf = buf
+
+
+def release():
+    """
+    Libère le bandeau, le fond du rendu et les tables des effets ; à appeler
+    quand aucune animation ne tourne (par ex. on_done d'Animator.play). Les
+    LEDs gardent leur dernière couleur, la prochaine trame recrée le tout.
+    """
+    global _np, _renderer, _wheel_strip, _out
+    _np = _renderer = _wheel_strip = _out = None
+    gc.collect()
+
+
+# Joue une animation jusqu'au bout (bloquant), au rythme de l'horloge de trames
+def _play(frames):
+    return play_blocking(frames, write)
 
 # Fonction pour définir une couleur unique sur toutes les LEDs
 def set_color(color):
-    for i in range(NUM_PIXELS):
-        np[i] = color
-    np.write()
+    renderer().fill(color)
+    write()
     
 def set_color_end(color):
-    for i in range(NUM_PIXELS - 30, NUM_PIXELS):
-        np[i] = color
-    np.write()
+    renderer().fill(color, NUM_PIXELS - 30, NUM_PIXELS)
+    write()
         
 # Mode: Allumer tout le bandeau en blanc avec intensité de 33%
 def white_low_intensity():
@@ -34,154 +144,210 @@ def white_low_intensity():
 
 
 # Mode: Effet de déplacement d'un point lumineux
-def moving_point(color, delay=0.03):
+def moving_point_frames(color, delay=0.03):
+    np = strip()
     for i in range(NUM_PIXELS):
         np.fill((0, 0, 0))  # Éteint toutes les LEDs
         np[i] = color       # Allume une LED
-        np.write()
-        time.sleep(delay)
+        yield delay
+
+def moving_point(color, delay=0.03):
+    _play(moving_point_frames(color, delay))
 
 # Mode: Effet de remplissage progressif
-def filling_effect(color, delay=0.03):
-    for i in range(NUM_PIXELS):
-        if i % 2 == 0:  # Allume une LED sur deux
-            np[i] = color  # Ajoute une LED allumée
-            np.write()
-            time.sleep(delay)
+def filling_effect_frames(color, delay=0.03, step=2):
+    np = strip()
+    for i in range(0, NUM_PIXELS, step):  # Allume une LED sur `step` (toutes avec step=1)
+        np[i] = color  # Ajoute une LED allumée
+        yield delay
+
+def filling_effect(color, delay=0.03, step=2):
+    _play(filling_effect_frames(color, delay, step))
 
 # Mode: Animation de comète blanche superposée sur un fond rouge
+# (base_colors : couleurs du fond, motif répété s'il est plus court que le bandeau)
+def white_comet_over_red_frames(base_colors, trail_length=10, delay=0.02):
+    return led_compose.frames(renderer(), {
+        "background": base_colors,
+        # Comète blanche avec luminosité décroissante derrière la tête, qui
+        # entre par le premier pixel
+        "layers": [{"length": trail_length, "head": "front", "start": 1 - trail_length}],
+    }, delay)
+
 def white_comet_over_red(base_colors, trail_length=10, delay=0.02):
-    for i in range(NUM_PIXELS + trail_length):
-        # Créer une copie de l'état de base
-        display_colors = base_colors.copy()
-        
-        # Dessiner la comète blanche
-        for j in range(trail_length):
-            pos = i - j
-            if 0 <= pos < NUM_PIXELS:
-                brightness = 255 - (j * (255 // trail_length))  # Diminution progressive de la luminosité
-                display_colors[pos] = (brightness, brightness, brightness)  # Comète blanche avec luminosité décroissante
-        
-        # Définir les couleurs LED individuellement
-        for idx in range(NUM_PIXELS):
-            np[idx] = display_colors[idx]
-        np.write()
-        time.sleep(delay)
+    _play(white_comet_over_red_frames(base_colors, trail_length, delay))
 
 # Mode: Arc-en-ciel
 def wheel(pos):
-    """Génère des couleurs arc-en-ciel"""
-    if pos < 85:
-        return (pos * 3, 255 - pos * 3, 0)
-    elif pos < 170:
-        pos -= 85
-        return (255 - pos * 3, 0, pos * 3)
-    else:
-        pos -= 170
-        return (0, pos * 3, 255 - pos * 3)
+    """Génère des couleurs arc-en-ciel (lues dans la table précalculée)"""
+    from led_lut import WHEEL
+    i = (pos & 255) * 3
+    return (WHEEL[i], WHEEL[i + 1], WHEEL[i + 2])
 
-def rainbow_cycle(delay=0.01):
+def rainbow_cycle_frames(delay=0.01):
+    global _wheel_strip
+    r = renderer()
+    if _wheel_strip is None:
+        # Roue arc-en-ciel dans l'ordre des octets du bandeau
+        from led_lut import wheel_table
+        _wheel_strip = wheel_table(r.order, r.bpp)
+    # Teinte de départ de chaque LED, calculée une fois
+    offsets = array('B', [i * 256 // NUM_PIXELS for i in range(NUM_PIXELS)])
+    table = _wheel_strip
+    buf = r.buf
+    bpp = r.bpp
     for j in range(255):
+        # Uniquement des accès indexés : trois octets copiés depuis la table par LED
+        o = 0
         for i in range(NUM_PIXELS):
-            pixel_index = (i * 256 // NUM_PIXELS) + j
-            np[i] = wheel(pixel_index & 255)
-        np.write()
-        time.sleep(delay)
+            k = ((offsets[i] + j) & 255) * bpp
+            buf[o] = table[k]
+            buf[o + 1] = table[k + 1]
+            buf[o + 2] = table[k + 2]
+            o += bpp
+        yield delay
+
+def rainbow_cycle(delay=0.01):
+    _play(rainbow_cycle_frames(delay))
 
 # Mode: Chemin unique avec point lumineux
-def single_path(color, delay=0.1):
+def single_path_frames(color, delay=0.1):
+    np = strip()
     for i in range(NUM_PIXELS):
         np.fill((0, 0, 0))
         np[i] = color
-        np.write()
-        time.sleep(delay)
+        yield delay
+
+def single_path(color, delay=0.1):
+    _play(single_path_frames(color, delay))
 
 # Mode: Chemin unique avec remplissage
-def single_filling(color, delay=0.1):
+def single_filling_frames(color, delay=0.1):
+    np = strip()
     for i in range(NUM_PIXELS):
         np[i] = color
-        np.write()
-        time.sleep(delay)
+        yield delay
+
+def single_filling(color, delay=0.1):
+    _play(single_filling_frames(color, delay))
 
 # Nouvelle animation: Remplir une LED sur deux en rouge à 50% puis envoyer des comètes blanches
-def fill_red_with_white_comets(delay=0.03, trail_length=10, comet_delay=0.02):
+def fill_red_with_white_comets_frames(delay=0.03, trail_length=10, comet_delay=0.02):
     # Créer l'état de base avec une LED sur deux en rouge à 50%
-    base_colors = [(127, 0, 0) if i % 2 == 0 else (0, 0, 0) for i in range(NUM_PIXELS)]
-    
-    # Définir les couleurs individuellement
-    for i in range(NUM_PIXELS):
-        np[i] = base_colors[i]
-    np.write()
-    time.sleep(1)  # Pause d'une seconde
+    base_colors = [(127, 0, 0), (0, 0, 0)]
+    r = renderer()
+    r.set_background(base_colors)
+    r.show_background()
+    yield 1  # Pause d'une seconde
     
     # Envoyer des comètes blanches par-dessus le fond rouge
-    white_comet_over_red(base_colors, trail_length=trail_length, delay=comet_delay)
+    yield from white_comet_over_red_frames(base_colors, trail_length=trail_length, delay=comet_delay)
 
-def triple_white_comet_on_red(base_color=(127, 0, 0), comet_color=(102, 102, 102),
-                               comet_length=10, gap_length=15, delay=0.02):
+def fill_red_with_white_comets(delay=0.03, trail_length=10, comet_delay=0.02):
+    _play(fill_red_with_white_comets_frames(delay, trail_length, comet_delay))
+
+def triple_white_comet_on_red_frames(base_color=(127, 0, 0), comet_color=(255, 255, 255),
+                                      comet_length=10, gap_length=15, delay=0.02):
     """
     Crée une animation de trois comètes blanches séparées par des LED rouges, se déplaçant ensemble.
 
     :param base_color: Couleur de fond (rouge par défaut à 50 % d'intensité, une LED sur deux)
-    :param comet_color: Couleur des comètes (blanc par défaut)
+    :param comet_color: Couleur des comètes (blanc par défaut), affichée à 40 % d'intensité
     :param comet_length: Longueur de chaque comète
     :param gap_length: Nombre de LEDs rouges entre chaque comète
     :param delay: Temps de pause entre chaque mise à jour de l'animation
     """
-    total_comet_length = (comet_length * 3) + (gap_length * 2)  # Longueur totale d'un "bloc"
-
-    for i in range(NUM_PIXELS + total_comet_length):
-        # Préparation d'un tableau de couleurs de base avec une LED rouge sur deux
-        display_colors = [(base_color if idx % 2 == 0 else (0, 0, 0)) for idx in range(NUM_PIXELS)]
+    return led_compose.frames(renderer(), {
+        "background": [base_color, (0, 0, 0)],  # Une LED rouge sur deux
+        # Trois comètes, dégradé de luminosité à 40%
+        "layers": [{"count": 3, "length": comet_length, "gap": gap_length,
+                    "color": comet_color, "scale": 0.4}],
+    }, delay)
 
-        for j in range(3):  # Trois comètes
-            start_pos = i - (j * (comet_length + gap_length))
-
-            for k in range(comet_length):  # Dessiner une comète blanche
-                pos = start_pos + k
-                if 0 <= pos < NUM_PIXELS:
-                    brightness = int((255 - (k * (255 // comet_length))) * 0.4)  # Dégradé de luminosité à 40%
-                    display_colors[pos] = (brightness, brightness, brightness)
+def triple_white_comet_on_red(base_color=(127, 0, 0), comet_color=(255, 255, 255),
+                               comet_length=10, gap_length=15, delay=0.02):
+    _play(triple_white_comet_on_red_frames(base_color, comet_color, comet_length, gap_length, delay))
 
-        # Mise à jour des LEDs
-        for idx in range(NUM_PIXELS):
-            np[idx] = display_colors[idx]
-        np.write()
-        time.sleep(delay)
-    
 # *** Nouvelle Animation: LEDs rouges avec effet de respiration ***
-def breathing_red_effect(duration=10):
+def breathing_red_effect_frames(duration=10):
     """
     Allume une LED sur deux en rouge avec un effet de respiration.
     Chaque LED a des paramètres de respiration aléatoires.
     
     :param duration: Durée de l'animation en secondes
     """
+    from led_lut import SIN8, phase_step
     # Identifier les LEDs rouges (une sur deux)
-    red_leds = list(range(0, NUM_PIXELS, 2))  # Toutes les LEDs paires
-    num_red_leds = len(red_leds)
+    num_red_leds = (NUM_PIXELS + 1) // 2  # Toutes les LEDs paires
     
-    # Initialisation des paramètres aléatoires pour chaque LED rouge
-    breathing_phases = [random.uniform(0, 2 * math.pi) for _ in red_leds]
-    breathing_speeds = [random.uniform(0.02, 0.05) for _ in red_leds]  # Vitesse de respiration
-    breathing_max_intensities = [random.randint(100, 255) for _ in red_leds]  # Intensité maximale
+    # Initialisation des paramètres aléatoires pour chaque LED rouge :
+    # phases et vitesses en virgule fixe 16 bits (un tour = 65536)
+    breathing_phases = array('H', [random.getrandbits(16) for _ in range(num_red_leds)])
+    breathing_speeds = array('H', [phase_step(random.uniform(0.02, 0.05)) for _ in range(num_red_leds)])  # Vitesse de respiration
+    breathing_max_intensities = array('B', [random.randint(100, 255) for _ in range(num_red_leds)])  # Intensité maximale
     
-    start_time = time.time()
+    # Octet rouge de la première LED, puis pas d'une LED rouge à la suivante
+    r = renderer()
+    buf = r.buf
+    red = r.order[0]
+    step = 2 * r.bpp
+    r.fill((0, 0, 0))  # Éteindre toutes les LEDs
     
-    while time.time() - start_time < duration:
-        np.fill((0, 0, 0))  # Éteindre toutes les LEDs
-        
-        for idx, led in enumerate(red_leds):
-            # Calculer la luminosité basée sur une onde sinusoïdale
-            brightness = breathing_max_intensities[idx] * (math.sin(breathing_phases[idx]) * 0.5 + 0.5)
-            brightness = int(brightness)
-            np[led] = (brightness, 0, 0)  # Rouge avec luminosité variable
+    end = time.ticks_add(time.ticks_ms(), int(duration * 1000))
+    
+    while time.ticks_diff(end, time.ticks_ms()) > 0:
+        o = red
+        for idx in range(num_red_leds):
+            # Luminosité lue dans la table du sinus (octet de poids fort de la phase)
+            phase = breathing_phases[idx]
+            buf[o] = (breathing_max_intensities[idx] * (SIN8[phase >> 8] + 1)) >> 8  # Rouge avec luminosité variable
             
-            # Mettre à jour la phase pour le prochain cycle
-            breathing_phases[idx] += breathing_speeds[idx]
-            if breathing_phases[idx] >= 2 * math.pi:
-                breathing_phases[idx] -= 2 * math.pi
+            # Mettre à jour la phase pour le prochain cycle (le tour boucle tout seul)
+            breathing_phases[idx] = (phase + breathing_speeds[idx]) & 0xFFFF
+            o += step
         
-        np.write()
-        time.sleep(0.03)  # Ajuster le délai pour contrôler la fluidité
+        yield 0.03  # Ajuster le délai pour contrôler la fluidité
+
+def breathing_red_effect(duration=10):
+    _play(breathing_red_effect_frames(duration))
+
+# Mode: Animation précalculée sur PC (led_compile.py), lue depuis la flash
+def file_animation_frames(path):
+    from led_player import frames
+    return frames(path, strip())
+
+def file_animation(path):
+    _play(file_animation_frames(path))
+
+# Mode: Clignotement de 30% des LEDs en blanc (confirmation sur buzzers et dancepad)
+def blink_thirty_percent_white_frames(blink_times=3, on_delay=0.5, off_delay=0.5):
+    """
+    Fait clignoter 30% des LEDs du bandeau en blanc.
+    - blink_times : nombre de clignotements
+    - on_delay    : durée (en s) lorsque les LEDs sont allumées
+    - off_delay   : durée (en s) lorsque les LEDs sont éteintes
+    """
+    np = strip()
+    r = renderer()
+    count = max(1, int(NUM_PIXELS * 0.3))  # 30% des LEDs
+    indices = array('H', range(NUM_PIXELS))
+
+    for _ in range(blink_times):
+        # Tirage sans remise : mélange de Fisher-Yates limité aux 'count'
+        # premières positions, qui forment la sélection
+        for i in range(count):
+            j = i + random.getrandbits(16) % (NUM_PIXELS - i)
+            indices[i], indices[j] = indices[j], indices[i]
+
+        # Allume uniquement les LEDs sélectionnées
+        r.fill((0, 0, 0))   # Éteint tout
+        for i in range(count):
+            np[indices[i]] = (255, 255, 255)  # Blanc
+        yield on_delay
+
+        # Éteint toutes les LEDs
+        r.fill((0, 0, 0))
+        yield off_delay
 
+def blink_thirty_percent_white(blink_times=3, on_delay=0.5, off_delay=0.5):
+    _play(blink_thirty_percent_white_frames(blink_times, on_delay, off_delay))
@@ -0,0 +1,158 @@
+# log.py
+# Journal à niveaux, en mémoire, pour remplacer les print() des chemins chauds.
+#
+#   import log
+#   log.warning("Erreur d'envoi: %s", e)    # formaté seulement à la lecture
+#   if __debug__:
+#       log.debug("x=%d y=%d", x, y)        # retiré du bytecode en production
+#   log.dump()                              # affiche le journal sur la console
+#   log.send(ws)                            # ou l'envoie sur le WebSocket
+#
+# Une entrée ne coûte qu'un tuple dans un tampon circulaire : ni formatage ni
+# écriture sur l'UART (synchrone, plusieurs ms par ligne à 115200 bauds).
+# Le message et ses arguments sont conservés tels quels et formatés avec %
+# seulement par lines() / dump() / send(). Exception : les chaînes et tampons
+# passés en argument sont remplacés par une copie tronquée à MAX_ARG_LEN, pour
+# qu'une entrée ne garde pas un gros message WebSocket en vie sur le tas (et
+# qu'un tampon mutable modifié ensuite ne change pas le journal).
+#
+# Les appels à log.debug() placés sous "if __debug__:" disparaissent quand le
+# code est compilé en mode optimisé (mpy-cross -O1 ou micropython.opt_level(1)).
+
+try:
+    from micropython import const
+except ImportError:  # CPython
+    def const(x):
+        return x
+
+try:
+    from time import ticks_ms
+except ImportError:  # CPython
+    from mptime import ticks_ms
+
+DEBUG = const(10)
+INFO = const(20)
+WARNING = const(30)
+ERROR = const(40)
+
+_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+# Nombre d'entrées conservées (les plus anciennes sont écrasées)
+RING_SIZE = 64
+
+# Longueur maximale conservée d'un argument str ou bytes
+MAX_ARG_LEN = const(64)
+
+# Niveau minimal enregistré, et niveau à partir duquel une entrée est aussi
+# affichée immédiatement sur la console (None : jamais)
+level = INFO
+echo_level = ERROR
+
+_ring = [None] * RING_SIZE
+_head = 0
+_count = 0
+dropped = 0  # Entrées écrasées avant d'avoir été lues
+
+
+def set_level(new_level, echo=None):
+    global level, echo_level
+    level = new_level
+    if echo is not None:
+        echo_level = echo
+
+
+def _format(entry):
+    stamp, lvl, msg, args = entry
+    if args:
+        try:
+            msg = msg % args
+        except Exception:
+            msg = "{} {}".format(msg, args)
+    return "[{}] {} {}".format(stamp, _NAMES.get(lvl, lvl), msg)
+
+
+def _clip(arg):
+    """Copie courte d'un argument str / bytes, ou l'argument lui-même."""
+    if isinstance(arg, str):
+        if len(arg) > MAX_ARG_LEN:
+            return "{}... ({} car.)".format(arg[:MAX_ARG_LEN], len(arg))
+    elif isinstance(arg, (bytes, bytearray, memoryview)):
+        if len(arg) > MAX_ARG_LEN:
+            return "{}... ({} octets)".format(bytes(arg[:MAX_ARG_LEN]), len(arg))
+        if not isinstance(arg, bytes):
+            return bytes(arg)
+    return arg
+
+
+def _record(lvl, msg, args):
+    global _head, _count, dropped
+    for arg in args:
+        if isinstance(arg, (str, bytes, bytearray, memoryview)) and \
+                (len(arg) > MAX_ARG_LEN or not isinstance(arg, (str, bytes))):
+            args = tuple(_clip(a) for a in args)
+            break
+    entry = (ticks_ms(), lvl, msg, args)
+    _ring[_head] = entry
+    _head = (_head + 1) % RING_SIZE
+    if _count < RING_SIZE:
+        _count += 1
+    else:
+        dropped += 1
+    if echo_level is not None and lvl >= echo_level:
+        print(_format(entry))
+
+
+def debug(msg, *args):
+    if level <= DEBUG:
+        _record(DEBUG, msg, args)
+
+
+def info(msg, *args):
+    if level <= INFO:
+        _record(INFO, msg, args)
+
+
+def warning(msg, *args):
+    if level <= WARNING:
+        _record(WARNING, msg, args)
+
+
+def error(msg, *args):
+    if level <= ERROR:
+        _record(ERROR, msg, args)
+
+
+def lines():
+    """Entrées du journal formatées, de la plus ancienne à la plus récente."""
+    start = (_head - _count) % RING_SIZE
+    for i in range(_count):
+        yield _format(_ring[(start + i) % RING_SIZE])
+
+
+def clear():
+    global _head, _count, dropped
+    for i in range(RING_SIZE):
+        _ring[i] = None
+    _head = 0
+    _count = 0
+    dropped = 0
+
+
+def dump(clear_after=False):
+    """Affiche le journal sur la console."""
+    if dropped:
+        print("({} entrées plus anciennes perdues)".format(dropped))
+    for line in lines():
+        print(line)
+    if clear_after:
+        clear()
+
+
+def send(ws, clear_after=True):
+    """Envoie le journal en un seul message texte sur le WebSocket ws."""
+    if not _count:
+        return True
+    ok = ws.send("\n".join(lines()), replay=False)
+    if ok and clear_after:
+        clear()
+    return ok
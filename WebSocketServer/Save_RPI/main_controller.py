@@ -1,8 +1,12 @@
 from machine import ADC, Pin
 import time
 import json
-from websocket_client import WebSocketClient
+import connection_manager
+import log
+from inputs import InputDispatcher, PRESS, BOTH
+from joystick import JoystickSampler, JoystickStreamer, calibrate, load_calibration, save_calibration
 import leds
+from animation import Animator
 
 # Configuration des broches pour le joystick
 xAxis = ADC(Pin(34, Pin.IN))
@@ -11,27 +15,8 @@ yAxis = ADC(Pin(35, Pin.IN))
 yAxis.atten(xAxis.ATTN_11DB)
 joystick_button = Pin(33, Pin.IN, Pin.PULL_UP)
 
-# Configuration des boutons pour les étapes
-synapse_button = Pin(25, Pin.IN, Pin.PULL_UP)
-lsd_button = Pin(26, Pin.IN, Pin.PULL_UP)
-ecstasy_button = Pin(27, Pin.IN, Pin.PULL_UP)
-champi_button = Pin(14, Pin.IN, Pin.PULL_UP)
-
-# Configuration du bouton "dessin"
-dessin_button = Pin(12, Pin.IN, Pin.PULL_UP)
-
-# Configuration des boutons pour les pinceaux
-pinceau_buttons = {
-    "pinceau1": Pin(18, Pin.IN, Pin.PULL_UP),
-    "pinceau2": Pin(5, Pin.IN, Pin.PULL_UP),
-    "pinceau3": Pin(17, Pin.IN, Pin.PULL_UP),
-    "pinceau4": Pin(16, Pin.IN, Pin.PULL_UP),
-    "pinceau5": Pin(4, Pin.IN, Pin.PULL_UP)
-}
-
-# Configuration du bouton pour confirmer la solution
+# Bouton pour confirmer la solution (lu au démarrage pour la recalibration)
 confirm_button = Pin(15, Pin.IN, Pin.PULL_UP)
-confirm_previous_state = True  # État précédent du bouton
 
 # Variable pour stocker le dernier pinceau cliqué
 last_pinceau = None
@@ -40,11 +25,15 @@ last_pinceau = None
 url_iPhoneConnect = "ws://192.168.10.213:8080/iPhoneConnect"
 url_controllerEsp = "ws://192.168.10.213:8080/controllerEsp"
 
-# Instanciation des WebSocketClient pour les deux routes
-ws_iPhoneConnect = WebSocketClient(url_iPhoneConnect)
-ws_controllerEsp = WebSocketClient(url_controllerEsp)
+# Clients partagés (une seule connexion par route pour tout le programme).
+# Mode regroupé sur controllerEsp seulement : les échantillons du joystick d'un
+# même tour de boucle partent en un seul segment TCP. Les trames regroupées
+# sont perdues si la connexion tombe avant flush() : iPhoneConnect, dont les
+# messages sont rejoués après une coupure, reste en envoi immédiat.
+ws_iPhoneConnect = connection_manager.get_client(url_iPhoneConnect)
+ws_controllerEsp = connection_manager.get_client(url_controllerEsp, coalesce=True)
 
-# Variables pour suivre l'état des étapes et du bouton "dessin"
+# Variables pour suivre l'état des étapes
 stages_started = {
     "Synapse": False,
     "LSD": False,
@@ -52,16 +41,87 @@ stages_started = {
     "Champi": False
 }
 
-dessin = False  # Variable pour l'état de "dessin"
+
+def start_stage(stage):
+    if stages_started[stage]:
+        log.info("Étape %s déjà commencée", stage)
+        return
+    msg = {"type": "updateStage", "stage": stage, "action": "start"}
+    ws_iPhoneConnect.send(json.dumps(msg))
+    stages_started[stage] = True
+    log.info("Étape %s commencée", stage)
+
+
+def select_brush(pinceau):
+    # Seulement si l'étape LSD est commencée
+    global last_pinceau
+    if stages_started["LSD"] and last_pinceau != pinceau:
+        last_pinceau = pinceau
+        msg = {"type": "pinceau", "action": "selectBrush", "brush": pinceau}
+        ws_iPhoneConnect.send(json.dumps(msg))
+        log.info("%s sélectionné", pinceau)
+
+
+def confirm_soluce():
+    msg = {"type": "updateStage", "action": "confirmSoluce"}
+    ws_iPhoneConnect.send(json.dumps(msg))
+    log.info("ConfirmSoluce envoyé")
+    # Remplissage progressif, joué trame par trame par la boucle principale
+    # (relancé depuis le début si on confirme à nouveau pendant l'animation)
+    animator.play(leds.triple_white_comet_on_red_frames(base_color=(127, 0, 0), comet_color=(255, 255, 255), comet_length=10, gap_length=15, delay=0.02),
+                  on_done=leds.release)  # LEDs, bandeau libéré à la fin
+
+
+# Table des entrées : (broche, front, anti-rebond en ms, à l'appui, au relâchement).
+# Une action est un message envoyé tel quel sur iPhoneConnect, ou une fonction.
+INPUT_MAP = (
+    # Étapes
+    (25, PRESS, 50, lambda: start_stage("Synapse"), None),
+    (26, PRESS, 50, lambda: start_stage("LSD"), None),
+    (27, PRESS, 50, lambda: start_stage("Ecstasy"), None),
+    (14, PRESS, 50, lambda: start_stage("Champi"), None),
+    # Dessin
+    (12, BOTH, 30, json.dumps({"type": "dessin", "action": "mouseDown"}),
+                   json.dumps({"type": "dessin", "action": "mouseUp"})),
+    # Pinceaux
+    (18, PRESS, 50, lambda: select_brush("pinceau1"), None),
+    (5, PRESS, 50, lambda: select_brush("pinceau2"), None),
+    (17, PRESS, 50, lambda: select_brush("pinceau3"), None),
+    (16, PRESS, 50, lambda: select_brush("pinceau4"), None),
+    (4, PRESS, 50, lambda: select_brush("pinceau5"), None),
+    # Confirmation de la solution
+    (15, PRESS, 200, confirm_soluce, None),
+)
 
 # Définir les plages de non-mouvement et le seuil de variation
+# (valeurs par défaut, remplacées par la calibration du joystick)
 NON_MOVEMENT_CENTER_X = 1850  # Valeur moyenne au repos pour X
 NON_MOVEMENT_CENTER_Y = 1900  # Valeur moyenne au repos pour Y
 NON_MOVEMENT_THRESHOLD = 200  # Plage autour du centre pour considérer le joystick comme immobile
 
-# Variables pour stocker l'état précédent
-previous_x = NON_MOVEMENT_CENTER_X
-previous_y = NON_MOVEMENT_CENTER_Y
+# Calibration : relue depuis la flash, ou mesurée au premier démarrage.
+# Maintenir le bouton du joystick + le bouton de confirmation au démarrage
+# pour recalibrer (sans toucher au joystick lui-même).
+calibration = load_calibration()
+if calibration is None or (not joystick_button.value() and not confirm_button.value()):
+    print("Calibration du joystick, ne pas le toucher...")
+    calibration = calibrate(xAxis, yAxis)
+    save_calibration(calibration)
+    print("Calibration enregistrée :", calibration)
+NON_MOVEMENT_CENTER_X = calibration["center_x"]
+NON_MOVEMENT_CENTER_Y = calibration["center_y"]
+NON_MOVEMENT_THRESHOLD = calibration["dead_band"]
+
+# Échantillonnage du joystick sur timer (500 Hz, moyenne glissante sur 16
+# lectures), indépendant du rythme de la boucle principale
+joystick_sampler = JoystickSampler(xAxis, yAxis, rate_hz=500, window=16)
+joystick_sampler.start()
+
+# Envoi du joystick piloté par les changements : variation minimale, débit
+# plafonné et échantillon centré au retour au repos ; trames binaires de
+# 8 octets si le serveur les accepte, JSON sinon
+joystick_streamer = JoystickStreamer(ws_controllerEsp, NON_MOVEMENT_CENTER_X, NON_MOVEMENT_CENTER_Y,
+                                     NON_MOVEMENT_THRESHOLD, min_delta=40, max_rate_hz=20)
 
 # Connexion aux WebSockets
 if ws_iPhoneConnect.connect():
@@ -74,112 +134,46 @@ if ws_controllerEsp.connect():
 else:
     print("Échec de connexion au serveur WebSocket controllerEsp")
 
+# Animations LED non bloquantes : joystick, boutons et WebSocket continuent
+# pendant qu'elles tournent
+animator = Animator(leds.write)
+
+# Boutons : interruptions sur chaque broche, traitement dans la boucle
+inputs = InputDispatcher(send=ws_iPhoneConnect.send)
+for pin_no, edge, debounce_ms, on_press, on_release in INPUT_MAP:
+    inputs.add(pin_no, edge, debounce_ms, on_press, on_release)
+
 try:
     while True:
-        # Lecture des valeurs du joystick
-        xValue = xAxis.read()
-        yValue = yAxis.read()
+        # Dernière valeur filtrée du joystick et envoi (si nécessaire)
+        xValue, yValue = joystick_sampler.read()
         btnValue = joystick_button.value()
+        joystick_streamer.update(xValue, yValue, btnValue)
+
+        # Fronts des boutons relevés par interruption depuis le tour précédent
+        inputs.poll()
+
+        # Trame suivante de l'animation LED en cours, si son délai est écoulé
+        animator.tick()
+
+        # Envoi groupé des messages du tour, puis entretien du keepalive
+        # (ping/pong, mesure du RTT) des deux connexions ; controllerEsp peut
+        # répondre à la proposition du format binaire du joystick
+        ws_iPhoneConnect.flush()
+        ws_controllerEsp.flush()
+        ws_iPhoneConnect.receive_nowait()
+        joystick_streamer.handle_message(ws_controllerEsp.receive_nowait())
 
-        # Vérifier si le joystick est en mouvement
-        is_x_moving = abs(xValue - NON_MOVEMENT_CENTER_X) > NON_MOVEMENT_THRESHOLD
-        is_y_moving = abs(yValue - NON_MOVEMENT_CENTER_Y) > NON_MOVEMENT_THRESHOLD
-
-        if is_x_moving or is_y_moving:
-            # Préparation des données au format JSON
-            joystick_data = {
-                "x": xValue,
-                "y": yValue,
-                "button": btnValue
-            }
-
-            # Envoi des données via WebSocket sur la route controllerEsp
-            ws_controllerEsp.send(json.dumps(joystick_data))
-            print(f"Joystick - Données envoyées : {joystick_data}")
-
-            # Mettre à jour l'état précédent
-            previous_x = xValue
-            previous_y = yValue
-
-        # Lecture des boutons pour les étapes
-        if not synapse_button.value():
-            if not stages_started["Synapse"]:
-                msg = {"type": "updateStage", "stage": "Synapse", "action": "start"}
-                ws_iPhoneConnect.send(json.dumps(msg))
-                stages_started["Synapse"] = True
-                print("Étape Synapse commencée")
-            else:
-                print("Étape Synapse déjà commencée")
-
-        if not lsd_button.value():
-            if not stages_started["LSD"]:
-                msg = {"type": "updateStage", "stage": "LSD", "action": "start"}
-                ws_iPhoneConnect.send(json.dumps(msg))
-                stages_started["LSD"] = True
-                print("Étape LSD commencée")
-            else:
-                print("Étape LSD déjà commencée")
-
-        if not ecstasy_button.value():
-            if not stages_started["Ecstasy"]:
-                msg = {"type": "updateStage", "stage": "Ecstasy", "action": "start"}
-                ws_iPhoneConnect.send(json.dumps(msg))
-                stages_started["Ecstasy"] = True
-                print("Étape Ecstasy commencée")
-            else:
-                print("Étape Ecstasy déjà commencée")
-
-        if not champi_button.value():
-            if not stages_started["Champi"]:
-                msg = {"type": "updateStage", "stage": "Champi", "action": "start"}
-                ws_iPhoneConnect.send(json.dumps(msg))
-                stages_started["Champi"] = True
-                print("Étape Champi commencée")
-            else:
-                print("Étape Champi déjà commencée")
-
-        # Gestion du bouton "dessin"
-        if not dessin_button.value():  # Bouton appuyé (LOW)
-            if not dessin:
-                dessin = True
-                msg = {"type": "dessin", "action": "mouseDown"}
-                ws_iPhoneConnect.send(json.dumps(msg))
-                print("Dessin ON (mouseDown envoyé)")
-        else:  # Bouton relâché (HIGH)
-            if dessin:
-                dessin = False
-                msg = {"type": "dessin", "action": "mouseUp"}
-                ws_iPhoneConnect.send(json.dumps(msg))
-                print("Dessin OFF (mouseUp envoyé)")
-
-        # Gestion des boutons des pinceaux (seulement si l'étape LSD est commencée)
-        if stages_started["LSD"]:
-            for pinceau, button in pinceau_buttons.items():
-                if not button.value():  # Bouton appuyé (LOW)
-                    if last_pinceau != pinceau:
-                        last_pinceau = pinceau
-                        msg = {"type": "pinceau", "action": "selectBrush", "brush": pinceau}
-                        ws_iPhoneConnect.send(json.dumps(msg))
-                        print(f"{pinceau} sélectionné")
-                    break
-
-        # Gestion du bouton pour confirmer la solution
-        confirm_current_state = confirm_button.value()
-        if not confirm_current_state and confirm_previous_state:  # Transition de HIGH à LOW (clic)
-            msg = {"type": "updateStage", "action": "confirmSoluce"}
-            ws_iPhoneConnect.send(json.dumps(msg))
-            print("ConfirmSoluce envoyé")
-            # Remplissage progressif
-            leds.triple_white_comet_on_red(base_color=(127, 0, 0), comet_color=(255, 255, 255), comet_length=10, gap_length=15, delay=0.02)  # LEDs
-            time.sleep(1)
-        confirm_previous_state = confirm_current_state
-
-        # Pause pour éviter les rebonds
-        time.sleep(0.1)
+        # L'anti-rebond est fait par horodatage : la pause ne fixe plus que la
+        # latence de traitement des boutons
+        time.sleep(0.002)
 except KeyboardInterrupt:
     print("Arrêt de l'envoi des données")
 finally:
-    ws_iPhoneConnect.close()
-    ws_controllerEsp.close()
+    joystick_sampler.stop()
+    print("Joystick - trafic :", joystick_streamer.stats())
+    print("LEDs - dernière animation :", animator.stats())
+    log.dump()
+    connection_manager.close_all()
     print("Connexion WebSocket fermée")
 
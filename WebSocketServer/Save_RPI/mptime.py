@@ -0,0 +1,53 @@
+# mptime.py
+# Fonctions de temps de MicroPython (ticks_ms, ticks_us, ticks_add,
+# ticks_diff, sleep_ms, sleep_us) pour CPython, pour que websocket_client.py,
+# animation.py, log.py... tournent tels quels sur PC. Les ticks reviennent
+# à 0 après TICKS_MAX comme sur la carte : un calcul qui oublie ticks_diff()
+# se voit aussi sur PC. Inutile sur la carte (à ne pas copier).
+#
+#   try:
+#       from time import ticks_ms, ticks_diff
+#   except ImportError:  # CPython
+#       from mptime import ticks_ms, ticks_diff
+#
+# ou, pour les modules qui appellent time.ticks_ms() (leds.py...) :
+#
+#   import mptime
+#   mptime.install()
+
+import time
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALF = TICKS_PERIOD // 2
+
+
+def ticks_ms():
+    return int(time.perf_counter() * 1000) & TICKS_MAX
+
+
+def ticks_us():
+    return int(time.perf_counter() * 1000000) & TICKS_MAX
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + _TICKS_HALF) & TICKS_MAX) - _TICKS_HALF
+
+
+def sleep_ms(ms):
+    time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    time.sleep(us / 1000000)
+
+
+def install():
+    """Ajoute au module time les fonctions absentes (sans rien remplacer)."""
+    for name in ("ticks_ms", "ticks_us", "ticks_add", "ticks_diff", "sleep_ms", "sleep_us"):
+        if not hasattr(time, name):
+            setattr(time, name, globals()[name])
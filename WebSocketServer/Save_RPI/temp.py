@@ -1,8 +1,10 @@
 from machine import Pin
 import time
 import json
+import log
 from websocket_client import WebSocketClient
-from leds import blink_thirty_percent_white  # Import de la nouvelle fonction d'animation
+import leds as strip_leds  # Bandeau LED (leds.py commun, configuré par led_config.py)
+from animation import Animator
 
 # Configuration des broches boutons (entrée avec pull-up)
 boutons = [
@@ -30,6 +32,9 @@ for led, etat in zip(leds, etat_leds):
 # Pour stocker l'état précédent des boutons
 old_btn_pressed = [False] * 5
 
+# Animation du bandeau, jouée sans bloquer la lecture des boutons
+animator = Animator(strip_leds.write)
+
 # Connexion WebSocket
 url = "ws://192.168.10.213:8080/buzzersEsp"
 ws = WebSocketClient(url)
@@ -38,8 +43,8 @@ print("Connexion au serveur WebSocket (buzzersEsp) ...")
 if ws.connect():
     print("Connecté au serveur WebSocket (buzzersEsp)")
 else:
-    print("Échec connexion (buzzersEsp)")
-    raise SystemExit
+    # Plus d'arrêt : le client se reconnecte tout seul et rejoue les envois en attente
+    print("Échec connexion (buzzersEsp), nouvelle tentative en arrière-plan")
 
 def is_pressed(pin: Pin) -> bool:
     """
@@ -60,7 +65,7 @@ try:
                 # L'utilisateur vient d'appuyer sur le bouton
                 etat_leds[i] = not etat_leds[i]
                 leds[i].value(etat_leds[i])
-                print(f"Bouton {i + 1} pressé -> LED{i + 1} = {etat_leds[i]}")
+                log.info("Bouton %d pressé -> LED%d = %s", i + 1, i + 1, etat_leds[i])
 
                 # Calcul de buzzersPressed
                 pressed = sum(1 for etat in etat_leds if etat)
@@ -70,21 +75,26 @@ try:
                     "buzzersTotal": 5
                 }
                 ws.send(json.dumps(data))
-                print(f"Envoi: {data}")
+                log.info("Envoi: %s", data)
 
             # Mettre à jour l'état précédent
             old_btn_pressed[i] = btn_pressed_now
 
         # --- Écoute du WebSocket pour recevoir les messages du serveur ---
-        message = ws.receive()
+        # receive_nowait ne bloque pas : les boutons restent scrutés même si le serveur se tait
+        message = ws.receive_nowait()
         if message:
             # Si un message a été reçu
-            print("Message reçu du WS:", message)
+            log.info("Message reçu du WS: %s", message)
             if message == "confirmSoluce":
-                print("Lancement de l'animation confirmSoluce !")
-                blink_thirty_percent_white(blink_times=5, on_delay=0.2, off_delay=0.2)
+                log.info("Lancement de l'animation confirmSoluce !")
+                animator.play(strip_leds.blink_thirty_percent_white_frames(blink_times=5, on_delay=0.2, off_delay=0.2),
+                              on_done=strip_leds.release)
                 # Vous pouvez ajuster les paramètres blink_times, on_delay, off_delay selon vos préférences
 
+        # Trame suivante de l'animation en cours
+        animator.tick()
+
         # Petite pause pour limiter l'utilisation CPU
         time.sleep(0.05)
 
@@ -1,15 +1,227 @@
-import usocket as socket
-import ubinascii
-import uhashlib
-import urandom as random
+try:
+    import usocket as socket
+    import uselect as select
+    import ubinascii
+    import uhashlib
+    import urandom as random
+    import uerrno as errno
+except ImportError:  # CPython (banc de test sur PC)
+    import socket
+    import select
+    import binascii as ubinascii
+    import hashlib as uhashlib
+    import random
+    import errno
+
+import log
+
+try:
+    from time import ticks_ms, ticks_add, ticks_diff
+except ImportError:  # CPython
+    from mptime import ticks_ms, ticks_add, ticks_diff
+
+# Taille initiale des tampons d'émission et de réception (agrandis seulement pour les grosses trames)
+RECV_BUF_SIZE = 1024
+SEND_BUF_SIZE = 256
+
+# Taille initiale du tampon de réassemblage des messages fragmentés, et taille
+# maximale d'un message reçu (au-delà la connexion est fermée avec le code 1009)
+FRAGMENT_BUF_SIZE = 512
+MAX_MESSAGE_SIZE = 16384
+
+# Reconnexion automatique : backoff exponentiel avec gigue, plafonné pour
+# retrouver le serveur en moins d'une seconde après son redémarrage
+RECONNECT_MIN_MS = 50
+RECONNECT_MAX_MS = 500
+
+# Nombre de messages gardés en attente pendant une coupure (les plus anciens sont écrasés)
+OUTBOX_SIZE = 16
+
+# Délai maximal pour la connexion TCP et la poignée de main HTTP, et taille
+# maximale acceptée pour les en-têtes de la réponse
+CONNECT_TIMEOUT_MS = 3000
+MAX_HANDSHAKE_SIZE = 2048
+
+# Mode regroupé : au-delà de cette taille (un segment TCP) les trames en
+# attente sont envoyées sans attendre flush()
+COALESCE_LIMIT = 1460
+
+# Keepalive : nombre de pings consécutifs sans pong avant de considérer la
+# connexion comme morte, et nombre de mesures de RTT conservées
+MAX_MISSED_PONGS = 2
+RTT_WINDOW = 16
+
+# GUID de la RFC 6455 pour le calcul de Sec-WebSocket-Accept
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Socket non bloquant sans données à lire ou tampon d'émission plein
+_WOULD_BLOCK = (errno.EAGAIN, getattr(errno, 'EWOULDBLOCK', errno.EAGAIN))
+# Connexion TCP non bloquante lancée, pas encore établie
+_IN_PROGRESS = (errno.EINPROGRESS, getattr(errno, 'EALREADY', errno.EINPROGRESS)) + _WOULD_BLOCK
+
+# États de la connexion
+_CLOSED = 0      # Pas de socket
+_CONNECTING = 1  # Connexion TCP en cours
+_HANDSHAKE = 2   # Requête de poignée de main envoyée, réponse attendue
+_OPEN = 3        # Connecté
+
+
+def _would_block(e):
+    return bool(e.args) and e.args[0] in _WOULD_BLOCK
+
+
+# Masquage portable : taille des blocs XORés d'un coup (multiple de 4)
+MASK_CHUNK = 64
+
+
+def _mask_inplace_portable(buf, start, end, mask):
+    """
+    XOR sur place de buf[start:end] avec le masque de 4 octets.
+    Chaque bloc de MASK_CHUNK octets est traité comme un entier : le XOR est
+    fait en C au lieu d'une boucle Python par octet, et les entiers
+    temporaires restent de la taille d'un bloc quelle que soit la taille du
+    payload (la variante viper, elle, n'alloue rien).
+    """
+    length = end - start
+    if length <= 0:
+        return
+    i = start
+    if length >= MASK_CHUNK:
+        key = int.from_bytes(mask * (MASK_CHUNK >> 2), 'big')
+        view = memoryview(buf)
+        stop = start + length - length % MASK_CHUNK
+        while i < stop:
+            chunk = view[i:i + MASK_CHUNK]
+            chunk[:] = (int.from_bytes(chunk, 'big') ^ key).to_bytes(MASK_CHUNK, 'big')
+            i += MASK_CHUNK
+    # Reste (et petits payloads) : boucle directe
+    k = i - start
+    while i < end:
+        buf[i] ^= mask[k & 3]
+        i += 1
+        k += 1
+
+
+try:
+    from ws_mask import mask_inplace  # Variante viper (ESP32)
+except (ImportError, SyntaxError):
+    mask_inplace = _mask_inplace_portable
+
+
+def build_frame(buf, opcode, payload=b'', start=0):
+    """
+    Écrit une trame client (FIN + opcode, payload masqué sur place) dans buf à
+    partir de l'indice start. buf est remplacé par un nouveau bytearray (en
+    conservant buf[:start]) s'il est absent ou trop petit.
+    Retourne (buf, indice de fin de la trame).
+    """
+    length = len(payload)
+    if length < 126:
+        header_length = 6
+    elif length < 65536:
+        header_length = 8
+    else:
+        header_length = 14
+    end = start + header_length + length
+    if buf is None or end > len(buf):
+        new_buf = bytearray(max(end, 2 * len(buf)) if buf else end)
+        if start:
+            new_buf[:start] = memoryview(buf)[:start]
+        buf = new_buf
+
+    buf[start] = 0x80 | opcode
+    if length < 126:
+        buf[start + 1] = 0x80 | length
+    elif length < 65536:
+        buf[start + 1] = 0x80 | 126
+        buf[start + 2] = length >> 8
+        buf[start + 3] = length & 0xFF
+    else:
+        buf[start + 1] = 0x80 | 127
+        buf[start + 2:start + 10] = length.to_bytes(8, 'big')
+
+    payload_start = start + header_length
+    mask_bytes = random.getrandbits(32).to_bytes(4, 'big')
+    buf[payload_start - 4:payload_start] = mask_bytes
+    buf[payload_start:end] = payload
+    mask_inplace(buf, payload_start, end, mask_bytes)
+    return buf, end
+
+
+def backoff(delay_ms):
+    """
+    Attente avant la prochaine tentative de connexion et délai suivant :
+    première tentative immédiate (delay_ms = 0), puis délai doublé à chaque
+    échec, tiré au hasard dans [délai/2, délai] pour désynchroniser les cartes.
+    Retourne (attente en ms, délai suivant).
+    """
+    jitter = random.getrandbits(16) % (delay_ms // 2 + 1)
+    return delay_ms - jitter, min(max(2 * delay_ms, RECONNECT_MIN_MS), RECONNECT_MAX_MS)
+
 
 class WebSocketClient:
-    def __init__(self, url, ping_interval=20):
+    def __init__(self, url, ping_interval=5, recv_buf_size=RECV_BUF_SIZE,
+                 max_message_size=MAX_MESSAGE_SIZE, auto_reconnect=True,
+                 outbox_size=OUTBOX_SIZE, connect_timeout_ms=CONNECT_TIMEOUT_MS,
+                 max_missed_pongs=MAX_MISSED_PONGS, coalesce=False):
         self.url = url
         self.socket = None
         self.connected = False
+        self.connections = 0  # Connexions établies : change à chaque (re)connexion
+        self._state = _CLOSED
+        self._connect_deadline = 0
+        self._key = None
         self.ping_interval = ping_interval
+        self.connect_timeout_ms = connect_timeout_ms
         self._parse_url()
+
+        # Tampon de réception préalloué : les trames sont extraites par tranches
+        # memoryview, les octets restants sont conservés pour la trame suivante
+        self._recv_buf_size = recv_buf_size
+        self._rbuf = bytearray(recv_buf_size)
+        self._rmv = memoryview(self._rbuf)
+        self._rpos = 0  # Début des octets non consommés
+        self._rend = 0  # Fin des octets reçus
+        self._readinto = None
+        self._poller = None
+        self._wpoller = None
+
+        # Tampon d'émission réutilisé : en-tête et payload masqué sur place.
+        # En mode regroupé (coalesce=True) les trames s'y accumulent jusqu'à
+        # flush(), appelé une fois par tour de boucle : un seul write() par tour.
+        # Les trames pas encore envoyées sont perdues si la connexion tombe
+        # (pas de rejeu) : à réserver aux messages envoyés avec replay=False.
+        self._sbuf = bytearray(SEND_BUF_SIZE)
+        self._smv = memoryview(self._sbuf)
+        self._spos = 0  # Fin des trames en attente d'envoi
+        self.coalesce = coalesce
+
+        # Réassemblage des messages fragmentés (opcode 0x0)
+        self.max_message_size = max_message_size
+        self._fbuf = bytearray(min(FRAGMENT_BUF_SIZE, max_message_size))
+        self._flen = 0
+        self._fopcode = None  # Opcode du message en cours de réassemblage
+
+        # Keepalive : ping toutes les ping_interval secondes (0 pour désactiver),
+        # mesure du RTT sur les pong correspondants
+        self.max_missed_pongs = max_missed_pongs
+        self.last_pong_ms = None
+        self._next_ping_ms = ticks_ms()
+        self._ping_seq = 0
+        self._ping_sent_ms = None  # Date d'envoi du ping en attente de pong
+        self._missed_pongs = 0
+        self._rtt = [0] * RTT_WINDOW
+        self._rtt_count = 0
+        self.rtt_last = None
+
+        # Reconnexion automatique et file circulaire des messages à rejouer
+        self.auto_reconnect = auto_reconnect
+        self._closed_by_user = False
+        self._retry_delay_ms = 0
+        self._next_retry_ms = ticks_ms()
+        self._outbox = [None] * outbox_size
+        self._outbox_head = 0
+        self._outbox_count = 0
         
     def _parse_url(self):
         proto, dummy, host, path = self.url.split('/', 3)
@@ -25,184 +237,637 @@ class WebSocketClient:
         rand = bytes([random.getrandbits(8) for _ in range(16)])
         return ubinascii.b2a_base64(rand)[:-1]
 
-    def _apply_mask(self, data, mask):
-        masked = bytearray(len(data))
-        for i in range(len(data)):
-            masked[i] = data[i] ^ mask[i % 4]
-        return masked
+    def _handshake_request(self, key):
+        headers = [
+            'GET {} HTTP/1.1'.format(self.path),
+            'Host: {}:{}'.format(self.host, self.port),
+            'Connection: Upgrade',
+            'Upgrade: websocket',
+            'Sec-WebSocket-Key: {}'.format(key.decode()),
+            'Sec-WebSocket-Version: 13',
+            'Origin: http://{}:{}'.format(self.host, self.port),
+            '',
+            ''
+        ]
+        return '\r\n'.join(headers).encode()
 
-    def _read_exactly(self, num_bytes):
-        data = bytearray()
-        while len(data) < num_bytes:
+    def _check_handshake(self, response, key):
+        """
+        Vérifie la réponse HTTP du serveur (ligne de statut et en-têtes, sans
+        la ligne vide finale). Lève une exception si la poignée de main est refusée.
+        """
+        lines = response.split('\r\n')
+        status = lines[0].split(' ')
+        if len(status) < 2 or status[1] != '101':
+            raise OSError("Réponse inattendue: " + lines[0])
+
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        if headers.get('upgrade', '').lower() != 'websocket':
+            raise OSError("En-tête Upgrade manquant")
+        expected = ubinascii.b2a_base64(uhashlib.sha1(key + WS_GUID).digest())[:-1].decode()
+        if headers.get('sec-websocket-accept') != expected:
+            raise OSError("Sec-WebSocket-Accept invalide")
+
+    def _reset_reader(self):
+        self._rpos = 0
+        self._rend = 0
+        # CPython expose recv_into, MicroPython readinto. Le socket est non
+        # bloquant : readinto de MicroPython attendrait sinon d'avoir rempli
+        # toute la tranche demandée au lieu de rendre ce qui est arrivé
+        self._readinto = getattr(self.socket, 'recv_into', None) or self.socket.readinto
+        self._poller = select.poll()
+        self._poller.register(self.socket, select.POLLIN)
+        self._wpoller = select.poll()
+        self._wpoller.register(self.socket, select.POLLOUT)
+
+    def _make_room(self, num_bytes):
+        """Garantit que num_bytes octets tiennent après self._rpos dans le tampon."""
+        avail = self._rend - self._rpos
+        if num_bytes > len(self._rbuf):
+            # Trame plus grande que le tampon : on l'agrandit une fois pour toutes
+            new_buf = bytearray(max(num_bytes, 2 * len(self._rbuf)))
+            new_buf[:avail] = self._rmv[self._rpos:self._rend]
+            self._rbuf = new_buf
+            self._rmv = memoryview(new_buf)
+        elif self._rpos:
+            # Compactage : on ramène les octets restants au début du tampon
+            self._rbuf[:avail] = self._rbuf[self._rpos:self._rend]
+        else:
+            return
+        self._rpos = 0
+        self._rend = avail
+
+    def _fill(self):
+        """
+        Lit dans le tampon ce que le socket a de disponible. Retourne le nombre
+        d'octets lus, 0 si la connexion est fermée, None si rien n'est arrivé.
+        """
+        if self._rend == len(self._rbuf):
+            self._make_room(len(self._rbuf) - self._rpos + 1)
+        try:
+            n = self._readinto(self._rmv[self._rend:])
+        except OSError as e:
+            if _would_block(e):  # CPython
+                return None
+            raise
+        if n is None:  # MicroPython : rien à lire pour l'instant
+            return None
+        if not n:
+            return 0
+        self._rend += n
+        return n
+
+    def _ensure(self, num_bytes, deadline=None):
+        """
+        Attend que num_bytes octets soient disponibles dans le tampon.
+        Retourne True, False si la connexion est fermée, ou None si le délai
+        (deadline en ticks_ms) expire : les octets déjà reçus restent alors
+        dans le tampon pour l'appel suivant.
+        """
+        if self._rpos + num_bytes > len(self._rbuf):
+            self._make_room(num_bytes)
+        while self._rend - self._rpos < num_bytes:
             try:
-                chunk = self.socket.recv(1)
-                if not chunk:
+                timeout = -1
+                if deadline is not None:
+                    timeout = max(0, ticks_diff(deadline, ticks_ms()))
+                if not self._poller.poll(timeout):
                     return None
-                data.extend(chunk)
-            except:
+                n = self._fill()
+                if n is None:
+                    if timeout == 0:
+                        return None
+                    continue
+                if not n:
+                    self._disconnect()
+                    return False
+            except OSError:
+                self._disconnect()
+                return False
+        return True
+
+    def _read_exactly(self, num_bytes):
+        """Retourne une vue sur les num_bytes prochains octets (valide jusqu'à la prochaine lecture)."""
+        if not self._ensure(num_bytes):
+            return None
+        start = self._rpos
+        self._rpos += num_bytes
+        return self._rmv[start:self._rpos]
+
+    def _unread(self, data):
+        """Remet des octets déjà lus en tête du tampon de réception."""
+        if self._rpos < len(data):
+            avail = self._rend - self._rpos
+            self._make_room(avail + len(data))
+            self._rbuf[len(data):len(data) + avail] = self._rbuf[:avail]
+            self._rpos = len(data)
+            self._rend = avail + len(data)
+        self._rpos -= len(data)
+        self._rbuf[self._rpos:self._rpos + len(data)] = data
+
+    def _read_frame(self, deadline=None):
+        """
+        Extrait la prochaine trame complète du tampon de réception.
+        Retourne (premier octet, payload) où payload est une vue memoryview
+        sur le tampon, ou None si la connexion est interrompue ou si le délai
+        expire avant la fin de la trame (rien n'est consommé dans ce cas).
+        Une trame plus grande que max_message_size ferme la connexion (1009).
+        """
+        if self._rpos == self._rend and len(self._rbuf) > self._recv_buf_size:
+            # Tampon agrandi par une grosse trame déjà consommée : on le rend
+            self._rbuf = bytearray(self._recv_buf_size)
+            self._rmv = memoryview(self._rbuf)
+            self._rpos = self._rend = 0
+        if not self._ensure(2, deadline):
+            return None
+        pos = self._rpos
+        first = self._rbuf[pos]
+        second = self._rbuf[pos + 1]
+
+        # Gestion des longueurs étendues et du masque
+        payload_length = second & 0x7F
+        header_length = 2
+        if payload_length == 126:
+            header_length = 4
+        elif payload_length == 127:
+            header_length = 10
+        if second & 0x80:
+            header_length += 4
+        if not self._ensure(header_length, deadline):
+            return None
+
+        pos = self._rpos  # Le tampon a pu être compacté
+        if payload_length == 126:
+            payload_length = (self._rbuf[pos + 2] << 8) | self._rbuf[pos + 3]
+        elif payload_length == 127:
+            payload_length = int.from_bytes(self._rbuf[pos + 2:pos + 10], 'big')
+
+        # Avant d'agrandir le tampon : une longueur aberrante ne doit pas
+        # être allouée
+        if payload_length > self.max_message_size:
+            self._close_too_big()
+            return None
+
+        if not self._ensure(header_length + payload_length, deadline):
+            return None
+
+        start = self._rpos + header_length
+        end = start + payload_length
+        self._rpos = end
+
+        # Démasquage sur place si nécessaire
+        if second & 0x80:
+            mask_inplace(self._rbuf, start, end, bytes(self._rbuf[start - 4:start]))
+        return first, self._rmv[start:end]
+
+    def _send_frame(self, opcode, payload=b''):
+        """
+        Construit la trame à la suite des trames en attente dans le tampon
+        d'émission, puis envoie le tout, sauf en mode regroupé où l'envoi
+        attend flush(). Les trames de contrôle partent toujours immédiatement.
+        """
+        buf, self._spos = build_frame(self._sbuf, opcode, payload, self._spos)
+        if buf is not self._sbuf:
+            self._sbuf = buf
+            self._smv = memoryview(buf)
+        if not self.coalesce or opcode & 0x8 or self._spos >= COALESCE_LIMIT:
+            self._write_pending()
+
+    def _write_pending(self):
+        """Écrit toutes les trames en attente, en reprenant après une écriture partielle."""
+        end = self._spos
+        self._spos = 0
+        self._write_all(self._smv, end)
+
+    def _write_all(self, data, end):
+        """Écrit data[:end] sur le socket non bloquant, en attendant qu'il accepte la suite."""
+        sent = 0
+        while sent < end:
+            try:
+                n = self.socket.send(data[sent:end])
+            except OSError as e:
+                if not _would_block(e):
+                    raise
+                n = None
+            if n is None:
+                # Tampon d'émission du socket plein
+                if not self._wpoller.poll(self.connect_timeout_ms):
+                    raise OSError("Délai d'envoi dépassé")
+                continue
+            sent += n
+
+    def flush(self):
+        """Envoie en une seule écriture les trames regroupées depuis le dernier flush()."""
+        if not self._spos:
+            return True
+        if not self.connected:
+            self._spos = 0
+            return False
+        try:
+            self._write_pending()
+            return True
+        except Exception as e:
+            log.warning("Erreur d'envoi: %s", e)
+            self._disconnect()
+            return False
+
+
+    def _read_handshake(self, deadline):
+        """
+        Lit la réponse HTTP jusqu'à la ligne vide, même si elle arrive en
+        plusieurs segments. Les octets qui suivent (premières trames envoyées
+        dans le même segment) restent dans le tampon pour le lecteur de trames.
+        Retourne None si la réponse n'est pas complète à l'échéance deadline.
+        """
+        while True:
+            end = bytes(self._rmv[self._rpos:self._rend]).find(b'\r\n\r\n')
+            if end >= 0:
+                break
+            available = self._rend - self._rpos
+            if available >= MAX_HANDSHAKE_SIZE:
+                raise OSError("Réponse de poignée de main trop longue")
+            result = self._ensure(available + 1, deadline)
+            if result is None:
                 return None
-        return data
-        
-    def connect(self):
+            if not result:
+                raise OSError("Connexion fermée pendant la poignée de main")
+
+        response = str(self._rmv[self._rpos:self._rpos + end], 'utf-8')
+        self._rpos += end + 4
+        return response
+
+    def _start_connect(self):
+        """Lance la connexion TCP sans l'attendre (socket non bloquant)."""
+        self._connect_deadline = ticks_add(ticks_ms(), self.connect_timeout_ms)
+        self.socket = socket.socket()
+        self.socket.setblocking(False)
+        self._reset_reader()
+        self._spos = 0
+        self._state = _CONNECTING
         try:
-            self.socket = socket.socket()
             self.socket.connect((self.host, self.port))
-            
-            key = self._generate_key()
-            headers = [
-                'GET {} HTTP/1.1'.format(self.path),
-                'Host: {}:{}'.format(self.host, self.port),
-                'Connection: Upgrade',
-                'Upgrade: websocket',
-                'Sec-WebSocket-Key: {}'.format(key.decode()),
-                'Sec-WebSocket-Version: 13',
-                'Origin: http://{}:{}'.format(self.host, self.port),
-                '',
-                ''
-            ]
-            
-            self.socket.send('\r\n'.join(headers).encode())
-            
-            response = self.socket.recv(4096).decode()
-            
-            if "101 Switching Protocols" in response:
-                self.connected = True
-                return True
-            else:
+        except OSError as e:
+            if not e.args or e.args[0] not in _IN_PROGRESS:
+                raise
+
+    def _advance_connect(self, timeout_ms=0):
+        """
+        Fait avancer la connexion lancée par _start_connect() en attendant au
+        plus timeout_ms. Retourne True une fois la poignée de main validée,
+        None si elle est toujours en cours ; lève OSError si elle échoue ou si
+        connect_timeout_ms est dépassé.
+        """
+        now = ticks_ms()
+        if ticks_diff(self._connect_deadline, now) <= 0:
+            raise OSError("Délai de connexion dépassé")
+        until = ticks_add(now, timeout_ms)
+        if ticks_diff(self._connect_deadline, until) < 0:
+            until = self._connect_deadline
+
+        if self._state == _CONNECTING:
+            # Socket inscriptible : connexion TCP établie (ou refusée)
+            events = self._wpoller.poll(max(0, ticks_diff(until, ticks_ms())))
+            if not events:
+                return None
+            if events[0][1] & (select.POLLERR | select.POLLHUP):
+                raise OSError("Connexion refusée")
+
+            # Petits messages interactifs : pas d'attente de l'algorithme de Nagle
+            try:
+                self.socket.setsockopt(getattr(socket, 'IPPROTO_TCP', 6),
+                                       getattr(socket, 'TCP_NODELAY', 1), 1)
+            except (OSError, AttributeError):
+                pass
+
+            self._key = self._generate_key()
+            request = self._handshake_request(self._key)
+            self._write_all(memoryview(request), len(request))
+            self._state = _HANDSHAKE
+
+        response = self._read_handshake(until)
+        if response is None:
+            return None
+        self._check_handshake(response, self._key)
+
+        self._state = _OPEN
+        self.connected = True
+        self.connections += 1
+        self._retry_delay_ms = 0
+        self._ping_sent_ms = None
+        self._missed_pongs = 0
+        self._next_ping_ms = ticks_add(ticks_ms(), int(self.ping_interval * 1000))
+        return True
+
+    def connect(self):
+        """Se connecte en attendant au plus connect_timeout_ms. Retourne True si la connexion est établie."""
+        self._closed_by_user = False
+        if self.socket:
+            self._disconnect()
+        try:
+            self._start_connect()
+            while not self._advance_connect(ticks_diff(self._connect_deadline, ticks_ms())):
+                pass
+            return True
+        except Exception as e:
+            log.warning("Erreur de connexion: %s", e)
+            self._disconnect()
+            return False
+
+    def _disconnect(self):
+        """Ferme le socket après une perte de connexion et planifie la prochaine tentative."""
+        if not self.socket:
+            return
+        try:
+            self.socket.close()
+        except:
+            pass
+        self.socket = None
+        self.connected = False
+        self._state = _CLOSED
+        self._fopcode = None
+
+        wait, self._retry_delay_ms = backoff(self._retry_delay_ms)
+        self._next_retry_ms = ticks_add(ticks_ms(), wait)
+
+    def ensure_connected(self, wait_ms=0):
+        """
+        Retourne True si la connexion est établie. Sinon, et si le délai de
+        backoff est écoulé, lance une reconnexion ou fait avancer celle en
+        cours en attendant au plus wait_ms (0 : jamais bloquant), puis rejoue
+        les messages en attente une fois reconnecté.
+        """
+        if self.connected:
+            return True
+        if not self.auto_reconnect or self._closed_by_user:
+            return False
+        try:
+            if self._state == _CLOSED:
+                if ticks_diff(self._next_retry_ms, ticks_ms()) > 0:
+                    return False
+                self._start_connect()
+            if not self._advance_connect(wait_ms):
                 return False
-                
         except Exception as e:
-            print("Erreur de connexion:", e)
+            log.warning("Erreur de connexion: %s", e)
+            self._disconnect()
             return False
+        log.info("Reconnecté au serveur WebSocket %s", self.url)
+        self._flush_outbox()
+        return self.connected
 
-    def receive(self, first_byte=None):
+    def _enqueue(self, data):
+        """Ajoute un message à la file d'attente ; si elle est pleine, le plus ancien est perdu."""
+        if not isinstance(data, (str, bytes)):
+            data = bytes(data)  # Le tampon de l'appelant peut être réutilisé
+        size = len(self._outbox)
+        if not size:
+            return
+        if self._outbox_count == size:
+            self._outbox[self._outbox_head] = None
+            self._outbox_head = (self._outbox_head + 1) % size
+            self._outbox_count -= 1
+        self._outbox[(self._outbox_head + self._outbox_count) % size] = data
+        self._outbox_count += 1
+
+    def _flush_outbox(self):
+        """Rejoue dans l'ordre les messages en attente. Retourne False si la connexion retombe."""
+        size = len(self._outbox)
+        while self._outbox_count:
+            try:
+                self._send_data(self._outbox[self._outbox_head])
+            except Exception as e:
+                log.warning("Erreur d'envoi: %s", e)
+                self._disconnect()
+                return False
+            self._outbox[self._outbox_head] = None
+            self._outbox_head = (self._outbox_head + 1) % size
+            self._outbox_count -= 1
+        return True
+
+    def _service_keepalive(self):
+        """Envoie le ping périodique et détecte les pong manquants."""
+        if not self.ping_interval or not self.connected:
+            return
+        now = ticks_ms()
+        if ticks_diff(self._next_ping_ms, now) > 0:
+            return
+        if self._ping_sent_ms is not None:
+            self._missed_pongs += 1
+            if self._missed_pongs >= self.max_missed_pongs:
+                # Inutile d'attendre le timeout TCP : on relance la connexion
+                log.warning("Pas de pong depuis %d pings, reconnexion", self._missed_pongs)
+                self._disconnect()
+                return
+        self._ping_seq = (self._ping_seq + 1) & 0xFFFFFFFF
+        self._ping_sent_ms = now
+        self._next_ping_ms = ticks_add(now, int(self.ping_interval * 1000))
         try:
-            # Premier byte
-            if first_byte:
-                fin = first_byte[0] & 0x80
-                opcode = first_byte[0] & 0x0F
-            else:
-                first = self._read_exactly(1)
-                if not first:
-                    return None
-                fin = first[0] & 0x80
-                opcode = first[0] & 0x0F
-                
-            # Deuxième byte
-            second = self._read_exactly(1)
-            if not second:
+            self._send_frame(0x9, self._ping_seq.to_bytes(4, 'big'))
+        except Exception as e:
+            log.warning("Erreur d'envoi du ping: %s", e)
+            self._disconnect()
+
+    def _handle_pong(self, payload):
+        now = ticks_ms()
+        self.last_pong_ms = now
+        if (self._ping_sent_ms is None or len(payload) != 4
+                or int.from_bytes(payload, 'big') != self._ping_seq):
+            return  # Pong spontané ou réponse à un ancien ping
+        rtt = ticks_diff(now, self._ping_sent_ms)
+        self._ping_sent_ms = None
+        self._missed_pongs = 0
+        self.rtt_last = rtt
+        self._rtt[self._rtt_count % RTT_WINDOW] = rtt
+        self._rtt_count += 1
+
+    def rtt_stats(self):
+        """
+        Statistiques de latence aller-retour (ms) sur les RTT_WINDOW derniers
+        pings : dict avec last, min, avg, max, count (pongs reçus) et missed
+        (pings en attente de réponse). Les valeurs sont None avant le premier pong.
+        """
+        n = min(self._rtt_count, RTT_WINDOW)
+        if not n:
+            return {'last': None, 'min': None, 'avg': None, 'max': None,
+                    'count': 0, 'missed': self._missed_pongs}
+        window = self._rtt[:n]
+        return {'last': self.rtt_last, 'min': min(window), 'avg': sum(window) // n,
+                'max': max(window), 'count': self._rtt_count, 'missed': self._missed_pongs}
+
+    def _append_fragment(self, payload):
+        """Ajoute un fragment au tampon de réassemblage. Retourne False si le message dépasse la taille maximale."""
+        end = self._flen + len(payload)
+        if end > self.max_message_size:
+            return False
+        if end > len(self._fbuf):
+            new_buf = bytearray(min(max(end, 2 * len(self._fbuf)), self.max_message_size))
+            new_buf[:self._flen] = memoryview(self._fbuf)[:self._flen]
+            self._fbuf = new_buf
+        self._fbuf[self._flen:end] = payload
+        self._flen = end
+        return True
+
+    def _decode_message(self, opcode, payload):
+        if opcode == 0x1:  # Text
+            try:
+                return str(payload, 'utf-8')
+            except UnicodeError:
+                log.warning("Erreur décodage UTF-8")
                 return None
-            
-            mask = second[0] & 0x80
-            payload_length = second[0] & 0x7F
-
-            # Gestion des longueurs étendues
-            if payload_length == 126:
-                length_data = self._read_exactly(2)
-                if not length_data:
-                    return None
-                payload_length = int.from_bytes(length_data, 'big')
-            elif payload_length == 127:
-                length_data = self._read_exactly(8)
-                if not length_data:
-                    return None
-                payload_length = int.from_bytes(length_data, 'big')
-            
-
-            # Lecture du masque si présent
-            mask_bits = None
-            if mask:
-                mask_bits = self._read_exactly(4)
-                if not mask_bits:
-                    print("Erreur lecture masque")
+        # Binary : copie, la vue sur le tampon n'est valable que jusqu'à la prochaine lecture
+        return bytes(payload)
+
+    def receive(self, first_byte=None, timeout_ms=None):
+        """
+        Retourne le prochain message : str pour un message texte, bytes pour
+        un message binaire, ou None. Les messages fragmentés sont réassemblés
+        (jusqu'à max_message_size octets), les ping/pong sont traités au passage.
+        Sans timeout_ms l'appel bloque jusqu'au prochain message ; avec
+        timeout_ms il rend la main au plus tard après ce délai. Une trame
+        partiellement reçue reste en tampon et sera complétée au prochain appel.
+        Le keepalive (ping périodique) est entretenu ici : un script qui ne fait
+        qu'envoyer doit appeler receive_nowait() à chaque tour de boucle.
+        """
+        # Pendant une coupure, la reconnexion avance au plus pendant timeout_ms
+        wait = self.connect_timeout_ms if timeout_ms is None else timeout_ms
+        if not self.ensure_connected(wait):
+            return None
+        try:
+            if first_byte:
+                self._unread(first_byte)
+
+            deadline = None
+            if timeout_ms is not None:
+                deadline = ticks_add(ticks_ms(), timeout_ms)
+
+            while True:
+                self._service_keepalive()
+                if not self.connected:
                     return None
 
-            # Lecture du payload
-            payload = self._read_exactly(payload_length)
-            if not payload:
-                print("Erreur lecture payload")
-                return None
+                # On se réveille au plus tard à l'échéance du prochain ping
+                wait_until = deadline
+                if self.ping_interval and (wait_until is None
+                                           or ticks_diff(self._next_ping_ms, wait_until) < 0):
+                    wait_until = self._next_ping_ms
+
+                frame = self._read_frame(wait_until)
+                if frame is None:
+                    if not self.connected:
+                        return None
+                    if deadline is not None and ticks_diff(deadline, ticks_ms()) <= 0:
+                        return None
+                    continue
+                first, payload = frame
+                fin = first & 0x80
+                opcode = first & 0x0F
 
-            # Démasquage si nécessaire
-            if mask_bits:
-                payload = self._apply_mask(payload, mask_bits)
-
-            # Traitement selon l'opcode
-            if opcode == 0x1:  # Text
-                try:
-                    message = payload.decode('utf-8')
-                    return message
-                except UnicodeError:
-                    print("Erreur décodage UTF-8")
+                # Traitement selon l'opcode
+                if opcode == 0x1 or opcode == 0x2:  # Text / Binary
+                    if fin:
+                        return self._decode_message(opcode, payload)
+                    self._fopcode = opcode
+                    self._flen = 0
+                    if not self._append_fragment(payload):
+                        break
+                elif opcode == 0x0:  # Continuation
+                    if self._fopcode is None:
+                        log.warning("Trame de continuation inattendue")
+                        continue
+                    if not self._append_fragment(payload):
+                        break
+                    if fin:
+                        opcode = self._fopcode
+                        self._fopcode = None
+                        return self._decode_message(opcode, memoryview(self._fbuf)[:self._flen])
+                elif opcode == 0x9:  # Ping
+                    self.send_pong(payload)
+                elif opcode == 0xA:  # Pong
+                    self._handle_pong(payload)
+                elif opcode == 0x8:  # Close
+                    log.info("Trame de fermeture reçue")
+                    self._send_close()
+                    self._disconnect()
                     return None
-            elif opcode == 0x9:  # Ping
-                self.send_pong()
-                return None
-            elif opcode == 0x8:  # Close
-                print("Trame de fermeture reçue")
-                self.close()
-                return None
-            else:
-                print(f"Opcode non géré: {opcode}")
-                return None
+                else:
+                    log.warning("Opcode non géré: %d", opcode)
+
+            # Message trop grand pour le tampon de réassemblage
+            self._close_too_big()
+            return None
 
         except Exception as e:
-            print(f"Erreur dans receive: {e}")
+            # État du lecteur incertain (trame à moitié consommée) : on repart
+            # d'une connexion neuve plutôt que de rejouer la même erreur
+            log.error("Erreur dans receive: %s", e)
+            self._disconnect()
             return None
 
-    def send(self, data):
-        if not self.connected:
-            raise Exception("Non connecté au serveur")
-            
-        data_bytes = data.encode()
-        mask_bytes = bytes([random.getrandbits(8) for _ in range(4)])
-        header = bytearray()
-        
-        header.append(0b10000001)  # FIN + Opcode TEXT
-        
-        length = len(data_bytes)
-        if length < 126:
-            header.append(0x80 | length)
-        elif length < 65536:
-            header.append(0x80 | 126)
-            header.extend(length.to_bytes(2, 'big'))
+    def _close_too_big(self):
+        log.error("Message trop grand (max %d octets)", self.max_message_size)
+        self._send_close(1009)
+        self._disconnect()
+
+    def receive_nowait(self):
+        """Retourne un message déjà arrivé, sans jamais bloquer (None sinon)."""
+        return self.receive(timeout_ms=0)
+
+    def _send_data(self, data):
+        if isinstance(data, str):
+            self._send_frame(0x1, data.encode())  # FIN + Opcode TEXT
         else:
-            header.append(0x80 | 127)
-            header.extend(length.to_bytes(8, 'big'))
-            
-        header.extend(mask_bytes)
-        masked_data = self._apply_mask(data_bytes, mask_bytes)
-        
+            self._send_frame(0x2, data)  # FIN + Opcode BINARY
+
+    def send(self, data, replay=True):
+        """
+        Envoie data en trame texte (str) ou binaire (bytes, bytearray, memoryview).
+        Pendant une coupure le message est mis en file et rejoué dans l'ordre
+        après la reconnexion ; replay=False le perd à la place (échantillons
+        haute fréquence, dont seule la valeur la plus récente compte).
+        """
+        if not self.ensure_connected():
+            if not self.auto_reconnect:
+                raise Exception("Non connecté au serveur")
+            if replay:
+                self._enqueue(data)
+            return False
+
+        if self._outbox_count and not self._flush_outbox():
+            if replay:
+                self._enqueue(data)
+            return False
+
         try:
-            self.socket.send(header + masked_data)
+            self._send_data(data)
             return True
         except Exception as e:
-            print("Erreur d'envoi:", e)
+            log.warning("Erreur d'envoi: %s", e)
+            self._disconnect()
+            if replay and self.auto_reconnect:
+                self._enqueue(data)
             return False
 
-    def send_pong(self):
+    def send_pong(self, payload=b''):
         if self.connected:
             try:
-                mask_bytes = bytes([random.getrandbits(8) for _ in range(4)])
-                header = bytearray([0x8A, 0x80])
-                header.extend(mask_bytes)
-                self.socket.send(header)
+                self._send_frame(0xA, payload)
             except:
                 pass
-            
-    def close(self):
-        if self.connected:
-            try:
-                mask_bytes = bytes([random.getrandbits(8) for _ in range(4)])
-                header = bytearray([0x88, 0x80])
-                header.extend(mask_bytes)
-                self.socket.send(header)
-                self.socket.close()
-            except:
-                pass
-        self.connected = False
-
-
-
 
+    def _send_close(self, code=None):
+        try:
+            self._send_frame(0x8, code.to_bytes(2, 'big') if code else b'')
+        except:
+            pass
 
+    def close(self, code=None):
+        """Ferme volontairement la connexion (sans reconnexion automatique)."""
+        self._closed_by_user = True
+        if self.connected:
+            self._send_close(code)
+        self._disconnect()
@@ -0,0 +1,43 @@
+# ws_mask.py
+# Masquage WebSocket accéléré (émetteur viper), importé par websocket_client.py
+# quand le firmware le supporte. Le code viper est isolé dans ce module car un
+# port sans émetteur natif refuse de compiler le fichier entier.
+
+import micropython
+
+
+@micropython.viper
+def mask_inplace(buf, start: int, end: int, mask):
+    """
+    XOR sur place de buf[start:end] avec le masque de 4 octets.
+    buf doit être le bytearray lui-même (adresse de base alignée) : les octets
+    de tête sont traités un par un jusqu'à l'alignement, puis par mots de 32 bits.
+    """
+    p8 = ptr8(buf)
+    m = ptr8(mask)
+    i = start
+    k = 0
+
+    # Octets de tête jusqu'à l'alignement sur 32 bits
+    while i < end and (i & 3):
+        p8[i] = p8[i] ^ m[k]
+        i += 1
+        k = (k + 1) & 3
+
+    # Mots de 32 bits (petit-boutiste) avec le masque décalé de k octets
+    words = (end - i) >> 2
+    if words > 0:
+        mw = m[k] | (m[(k + 1) & 3] << 8) | (m[(k + 2) & 3] << 16) | (m[(k + 3) & 3] << 24)
+        p32 = ptr32(buf)
+        w = i >> 2
+        stop = w + words
+        while w < stop:
+            p32[w] = p32[w] ^ mw
+            w += 1
+        i += words << 2
+
+    # Octets de queue
+    while i < end:
+        p8[i] = p8[i] ^ m[k]
+        i += 1
+        k = (k + 1) & 3
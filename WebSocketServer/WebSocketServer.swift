@@ -211,6 +211,29 @@ class WebSockerServer {
         }
     }
     
+    func handleJoystickSample(x: Int, y: Int, button: Int) {
+        // Mise à jour de l'état du joystick
+        self.joystickState["x"] = x
+        self.joystickState["y"] = y
+
+        // Créer un message pour l'iPhone
+        let joystickMsg: [String: Any] = [
+            "type": "joystick",
+            "x": x,
+            "y": y,
+            "button": button
+        ]
+
+        if let jsonData = try? JSONSerialization.data(withJSONObject: joystickMsg, options: []),
+           let jsonString = String(data: jsonData, encoding: .utf8),
+           let iphoneSession = self.iPhoneClient?.session {
+            iphoneSession.writeText(jsonString)
+            print("Joystick state envoyé à l'iPhone depuis ControllerESP : \(jsonString)")
+        } else {
+            print("Erreur : Impossible d'envoyer l'état du joystick à l'iPhone.")
+        }
+    }
+
     func checkSolution() {
         
         guard let champiStage = brainStages["Champi"], champiStage.started else {
@@ -1332,31 +1355,19 @@ class WebSockerServer {
                 if let data = receivedText.data(using: .utf8),
                    let messageDict = try? JSONSerialization.jsonObject(with: data, options: []) as? [String: Any] {
 
+                    // Proposition du format binaire du joystick (voir Save_RPI/joystick_frame.py)
+                    if messageDict["type"] as? String == "hello" {
+                        let formats = messageDict["formats"] as? [String] ?? []
+                        let format = formats.contains("bin1") ? "bin1" : "json"
+                        session.writeText("{\"type\": \"format\", \"format\": \"\(format)\"}")
+                        print("ControllerESP : format joystick \(format)")
+                    }
+
                     // Vérifiez si c'est un message de joystick
                     if let x = messageDict["x"] as? Int,
                        let y = messageDict["y"] as? Int,
                        let button = messageDict["button"] as? Int {
-
-                        // Mise à jour de l'état du joystick
-                        self.joystickState["x"] = x
-                        self.joystickState["y"] = y
-
-                        // Créer un message pour l'iPhone
-                        let joystickMsg: [String: Any] = [
-                            "type": "joystick",
-                            "x": x,
-                            "y": y,
-                            "button": button
-                        ]
-
-                        if let jsonData = try? JSONSerialization.data(withJSONObject: joystickMsg, options: []),
-                           let jsonString = String(data: jsonData, encoding: .utf8),
-                           let iphoneSession = self.iPhoneClient?.session {
-                            iphoneSession.writeText(jsonString)
-                            print("Joystick state envoyé à l'iPhone depuis ControllerESP : \(jsonString)")
-                        } else {
-                            print("Erreur : Impossible d'envoyer l'état du joystick à l'iPhone.")
-                        }
+                        self.handleJoystickSample(x: x, y: y, button: button)
                     }
 
                     // Gestion des autres types de messages
@@ -1504,7 +1515,15 @@ class WebSockerServer {
                  
             },
             dataCode: { session, receivedData in
-                print("ControllerESP a envoyé des données binaires sur controllerEsp")
+                // Trame binaire du joystick : type, flags, seq (uint16), x, y (int16), petit-boutiste
+                let bytes = [UInt8](receivedData)
+                guard bytes.count == 8, bytes[0] == 0x01 else {
+                    print("ControllerESP a envoyé des données binaires inconnues (\(bytes.count) octets)")
+                    return
+                }
+                let x = Int(Int16(bitPattern: UInt16(bytes[4]) | UInt16(bytes[5]) << 8))
+                let y = Int(Int16(bitPattern: UInt16(bytes[6]) | UInt16(bytes[7]) << 8))
+                self.handleJoystickSample(x: x, y: y, button: Int(bytes[1] & 0x01))
             },
             connectedCode: { session in
                 let clientSession = ClientSession(session: session)